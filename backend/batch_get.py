@@ -0,0 +1,35 @@
+import time
+
+# most keys a single BatchGetItem request accepts
+MAX_BATCH_KEYS = 100
+
+
+def batch_get_items(ddb, table_name, keys, projection, attr_names=None, attempts=5):
+    """
+    every item of `keys` that exists, read with BatchGetItem in batches of MAX_BATCH_KEYS.
+    unprocessed keys are retried with exponential backoff, None on error or if keys remain
+    unprocessed after `attempts` requests per batch. items come back in no particular order.
+    """
+    items = []
+    for start in range(0, len(keys), MAX_BATCH_KEYS):
+        request = {'Keys': keys[start:start + MAX_BATCH_KEYS], 'ProjectionExpression': projection}
+        if attr_names:
+            request['ExpressionAttributeNames'] = attr_names
+        request = {table_name: request}
+        try:
+            for attempt in range(attempts):
+                if attempt:
+                    # unprocessed keys mean the table is throttling, back off before asking again
+                    time.sleep(0.05 * 2 ** (attempt - 1))
+                ret = ddb.batch_get_item(RequestItems=request)
+                items.extend(ret['Responses'].get(table_name, []))
+                request = ret.get('UnprocessedKeys')
+                if not request:
+                    break
+            else:
+                print(f"Error in batch reading {table_name}, unprocessed keys remain")
+                return None
+        except Exception as e:
+            print(f"Error in batch reading {table_name} | {e}")
+            return None
+    return items
@@ -0,0 +1,65 @@
+"""
+net amount of every member of a group - the payables of all its transactions plus the
+settlements already applied to the group's `balances` map. positive amounts are owed to the
+member, negative amounts are owed by them. shared by GET /summary and member removal.
+"""
+from batch_get import batch_get_items
+from group_shards import group_transactions, is_shard_item
+
+
+def get_group(group_table, group_id):
+    """ group item with the attributes net_amounts needs, {} if there is no such group, None on error """
+    try:
+        ret = group_table.get_item(
+            Key={
+                'group_id': group_id
+            },
+            ProjectionExpression='group_id, shards, shard_of, #t, #b',
+            ExpressionAttributeNames={
+                "#t": "transactions",
+                "#b": "balances"
+            }
+        )
+    except Exception as e:
+        print(f"Error in fetching ddb entry for key(group_id) = {group_id} | {e}")
+        return None
+
+    # shard items share the table but are not groups
+    if 'Item' not in ret or is_shard_item(ret['Item']):
+        return {}
+    return ret['Item']
+
+
+def get_payables(ddb, trans_table_name, trans_ids):
+    """ payables of every transaction in trans_ids, None on error or if one of them does not exist """
+    trans_ids = list(dict.fromkeys(trans_ids))
+    items = batch_get_items(ddb, trans_table_name, [{'trans_id': trans_id} for trans_id in trans_ids],
+                            'trans_id, payables')
+    if items is None:
+        return None
+    if len(items) != len(trans_ids):
+        missing = set(trans_ids) - {item['trans_id'] for item in items}
+        print(f"error transactions not found - {missing}")
+        return None
+    return [item['payables'] for item in items]
+
+
+def net_amounts(ddb, group_table_name, trans_table_name, group):
+    """ {user_id: net amount} of a group item read with get_group, None on error """
+    transaction_ids = group_transactions(ddb, group_table_name, group)
+    if transaction_ids is None:
+        return None
+    payables_list = get_payables(ddb, trans_table_name, transaction_ids)
+    if payables_list is None:
+        return None
+
+    user_amounts = {}
+    for payables in payables_list:
+        for party in payables:
+            user_amounts[party] = user_amounts.get(party, 0) + payables[party]
+
+    # payments are applied to the group balances as they are recorded, no replay needed
+    balances = group.get('balances', {})
+    for party in balances:
+        user_amounts[party] = user_amounts.get(party, 0) + balances[party]
+    return user_amounts
@@ -1,9 +1,13 @@
 import os
-import json
 import uuid
 import datetime
 import boto3
 from botocore.exceptions import ClientError
+from schema import field, compile_schema, parse_body
+from serializer import dumps, response
+from group_shards import group_transactions, is_shard_item
+from membership_sets import convert_to_set
+from group_balances import get_group, net_amounts
 
 ddb = boto3.resource('dynamodb')
 user_table_name = os.environ.get('USER_TABLE')
@@ -17,12 +21,27 @@ try:
 except Exception as e:
     print(f"error initializing table connection - {e}")
 
+NEW_GROUP = compile_schema({
+    'name': field(str),
+    'members': field(list, items=str),
+    'details': field(str, required=False)
+})
+
+NEW_MEMBERS = compile_schema({
+    'members': field(list, items=str, min_items=1)
+})
+
 
 def lambda_handler(event :dict, context):
-    print(f"incoming event - {json.dumps(event)}")
+    print(f"incoming event - {dumps(event)}")
     http_method = event.get('httpMethod')
+    resource = event.get('resource') or ''
 
-    if http_method == 'POST':
+    if resource.endswith('/members') and http_method == 'POST':
+        return add_group_members(event)
+    elif resource.endswith('/members/{user_id}') and http_method == 'DELETE':
+        return remove_group_member(event)
+    elif http_method == 'POST':
         return add_new_group(event)
     elif http_method == 'GET':
         return ret_group_details(event)
@@ -31,19 +50,14 @@ def lambda_handler(event :dict, context):
 
 
 def add_new_group(event):
-    try:
-        request_body = json.loads(event.get('body'))
-    except Exception as e:
-        print(f"Error request body not valid json - {event.get('body')} | {e}")
-        return response(400, {'error': 'invalid parameters'})
-
-    # validate request params
-    if 'name' not in request_body or 'members' not in request_body or type(request_body['members']) is not list:
-        return response(400, {'error': 'invalid parameters'})
+    request_body, error = parse_body(event, NEW_GROUP)
+    if error is not None:
+        return response(400, {'error': 'invalid parameters', 'details': error})
 
     group_id = uuid.uuid4().hex[:8]
     timestamp = datetime.datetime.now().isoformat()
-    members = request_body['members']
+    # members are stored as a string set, drop duplicates up front
+    members = list(dict.fromkeys(request_body['members']))
 
     validated_members = update_user_table(members, group_id)
     
@@ -59,8 +73,9 @@ def add_new_group(event):
                 'group_id': group_id,
                 'name': request_body['name'],
                 'join_date': timestamp,
-                'members': validated_members,
+                'members': set(validated_members),
                 'transactions': [],
+                'balances': {},
                 'details': request_body.get('details', '')
             }    
         )
@@ -74,32 +89,204 @@ def add_new_group(event):
 def update_user_table(members, group_id):
     validated_members = []
     for user_id in members:
+        ret = add_user_group(user_id, group_id)
+        if ret == 'invalid_user':
+            continue
+        if ret != 'ok':
+            # the group is not created, take it back out of the users already updated
+            remove_user_group(validated_members, group_id)
+            return None
+        validated_members.append(user_id)
+    return validated_members
+
+
+def add_user_group(user_id, group_id, retry=True):
+    """ adds group_id to the user's groups set, returns 'ok', 'invalid_user' or 'error' """
+    try:
+        user_table.update_item(
+            Key={
+                'user_id': user_id
+            },
+            UpdateExpression="ADD #g :groupid",
+            ExpressionAttributeNames={
+                "#g": "groups",
+            },
+            ExpressionAttributeValues={
+                ":groupid": {group_id}
+            },
+            ConditionExpression=boto3.dynamodb.conditions.Attr("user_id").exists()
+        )
+
+    except ClientError as err:
+        if err.response["Error"]["Code"] == 'ConditionalCheckFailedException':
+            # user_id does not exist
+            return 'invalid_user'
+        if err.response["Error"]["Code"] == 'ValidationException' and retry:
+            # users created before groups was a string set hold a list
+            try:
+                convert_to_set(user_table, {'user_id': user_id}, 'groups')
+            except Exception as e:
+                print(f"Error in converting groups of {user_id} to a set | {e}")
+                return 'error'
+            return add_user_group(user_id, group_id, retry=False)
+        print(f"Error occured in updating user table for {user_id} | {err}")
+        return 'error'
+
+    except Exception as e:
+        print(f"Error occured in updating user table for {user_id} | {e}")
+        return 'error'
+    return 'ok'
+
+
+def remove_user_group(user_ids, group_id):
+    for user_id in user_ids:
         try:
-            ret = user_table.update_item(
+            user_table.update_item(
                 Key={
                     'user_id': user_id
                 },
-                UpdateExpression="SET #g = list_append(#g, :groupid)",
+                UpdateExpression="DELETE #g :groupid",
                 ExpressionAttributeNames={
                     "#g": "groups",
                 },
                 ExpressionAttributeValues={
-                    ":groupid": [group_id]
-                },
-                ConditionExpression=boto3.dynamodb.conditions.Attr("user_id").exists()
+                    ":groupid": {group_id}
+                }
             )
-        
-        except ClientError as err:
-            if err.response["Error"]["Code"] == 'ConditionalCheckFailedException':
-                # user_id does not exist
-                continue
-
         except Exception as e:
-            print(f"Error occured in updating user table for {user_id} | {e}")
-            return None
+            print(f"Error in removing group {group_id} from {user_id} | {e}")
 
-        validated_members.append(user_id)
-    return validated_members        
+
+def add_group_members(event):
+    path_params = event.get('pathParameters') or {}
+    if 'group_id' not in path_params:
+        return response(400, {'error': 'bad request'})
+    group_id = path_params['group_id']
+
+    request_body, error = parse_body(event, NEW_MEMBERS)
+    if error is not None:
+        return response(400, {'error': 'invalid parameters', 'details': error})
+
+    added = []
+    skipped = []
+    for user_id in dict.fromkeys(request_body['members']):
+        ret = update_membership(group_id, user_id, 'ADD')
+        if ret == 'ok':
+            added.append(user_id)
+        elif ret == 'invalid_user':
+            skipped.append(user_id)
+        elif ret == 'invalid_group':
+            return response(400, {'message': 'provided group_id not found'})
+        else:
+            return response(500, {'error': 'error adding members', 'added': added})
+
+    if len(added) == 0:
+        return response(400, {'error': 'member ids passed are not valid'})
+    return response(200, {'status': 'success', 'group_id': group_id, 'added': added, 'skipped': skipped})
+
+
+def remove_group_member(event):
+    path_params = event.get('pathParameters') or {}
+    if 'group_id' not in path_params or 'user_id' not in path_params:
+        return response(400, {'error': 'bad request'})
+    group_id = path_params['group_id']
+    user_id = path_params['user_id']
+
+    # settlements need both parties to be members, a member leaving with a balance could never settle it
+    balance = member_balance(group_id, user_id)
+    if balance is None:
+        return response(500, {'error': 'error removing member'})
+    if abs(balance) >= 0.1:
+        return response(400, {'error': f'{user_id} has an unsettled balance of {balance} in group {group_id}'})
+
+    ret = update_membership(group_id, user_id, 'DELETE')
+    if ret == 'invalid_group':
+        return response(400, {'message': f'{user_id} is not a member of group {group_id}'})
+    elif ret == 'invalid_user':
+        return response(400, {'message': 'provided user_id not found'})
+    elif ret != 'ok':
+        return response(500, {'error': 'error removing member'})
+    return response(200, {'status': 'success', 'group_id': group_id, 'removed': user_id})
+
+
+def member_balance(group_id, user_id):
+    """
+    net amount of user_id in the group, transactions plus recorded settlements, as GET /summary
+    computes it. 0 for a missing group (or shard item) or non member, None on error
+    """
+    group = get_group(group_table, group_id)
+    if group is None:
+        return None
+    if not group:
+        return 0
+    amounts = net_amounts(ddb, group_table_name, trans_table_name, group)
+    if amounts is None:
+        return None
+    return amounts.get(user_id, 0)
+
+
+def update_membership(group_id, user_id, action, retry=True):
+    """
+    ADDs / DELETEs user_id in the group's members set and group_id in the user's groups set
+    in a single transaction, so both sides always agree. constant cost whatever the group size.
+    legacy list valued groups / members are converted to sets and the update retried once.
+    returns 'ok', 'invalid_user', 'invalid_group' (group missing, or not a member on DELETE) or 'error'
+    """
+    if action == 'ADD':
+        # group must exist and not be a shard item, adding an existing member is a no-op
+        group_condition = "attribute_exists(group_id) AND attribute_not_exists(shard_of)"
+        group_values = {}
+    else:
+        group_condition = "contains(#m, :uid)"
+        group_values = {":uid": {'S': user_id}}
+
+    try:
+        ddb.meta.client.transact_write_items(
+            TransactItems=[
+                {
+                    'Update': {
+                        'TableName': user_table_name,
+                        'Key': {'user_id': {'S': user_id}},
+                        'UpdateExpression': f"{action} #g :groupid",
+                        'ExpressionAttributeNames': {"#g": "groups"},
+                        'ExpressionAttributeValues': {":groupid": {'SS': [group_id]}},
+                        'ConditionExpression': "attribute_exists(user_id)"
+                    }
+                },
+                {
+                    'Update': {
+                        'TableName': group_table_name,
+                        'Key': {'group_id': {'S': group_id}},
+                        'UpdateExpression': f"{action} #m :userid",
+                        'ExpressionAttributeNames': {"#m": "members"},
+                        'ExpressionAttributeValues': {":userid": {'SS': [user_id]}, **group_values},
+                        'ConditionExpression': group_condition
+                    }
+                }
+            ]
+        )
+    except ClientError as err:
+        if err.response["Error"]["Code"] == 'TransactionCanceledException':
+            reasons = [r.get('Code') for r in err.response.get('CancellationReasons', [])]
+            if len(reasons) == 2 and reasons[1] == 'ConditionalCheckFailed':
+                return 'invalid_group'
+            if len(reasons) == 2 and reasons[0] == 'ConditionalCheckFailed':
+                return 'invalid_user'
+            if 'ValidationError' in reasons and retry:
+                # user or group written before membership was a string set, convert and try again
+                try:
+                    convert_to_set(user_table, {'user_id': user_id}, 'groups')
+                    convert_to_set(group_table, {'group_id': group_id}, 'members')
+                except Exception as e:
+                    print(f"Error in converting membership of {user_id}, {group_id} to sets | {e}")
+                    return 'error'
+                return update_membership(group_id, user_id, action, retry=False)
+        print(f"Error in updating membership of {user_id} in {group_id} | {err}")
+        return 'error'
+    except Exception as e:
+        print(f"Error in updating membership of {user_id} in {group_id} | {e}")
+        return 'error'
+    return 'ok'
 
 
 def ret_group_details(event):
@@ -117,20 +304,16 @@ def ret_group_details(event):
         print(f"Error in fetching ddb entry for key(group_id) = {group_id} | {e}")
         return response(500, {'error': 'unable to find details'})
     
-    if 'Item' not in ret:
+    if 'Item' not in ret or is_shard_item(ret['Item']):
         return response(400, {'message': 'provided group_id not found'})
+
+    transactions = group_transactions(ddb, group_table_name, ret['Item'])
+    if transactions is None:
+        return response(500, {'error': 'unable to find details'})
     
     return response(200, {
         'status': 'success',
         'name': ret['Item']['name'],
-        'members': ret['Item']['members'],
-        'transactions': ret['Item']['transactions']
+        'members': sorted(ret['Item'].get('members', ())),
+        'transactions': transactions
     })
-
-
-def response(err_code :int, body :dict):
-    return {
-        'statusCode': err_code,
-        'headers': {'Content-Type': 'application/json'},
-        'body': json.dumps(body)
-    }
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""
+write sharding of a group's transaction list.
+
+every new transaction appends its id to the group's `transactions` list, so a busy group
+serializes all of its writes on one item. once a group sees more than
+SHARD_PROMOTE_WRITES_PER_MIN transaction writes within a minute it is promoted: `shards` is
+set on the group item and later writes append to one of `shards` shard items
+(group_id = '<group_id>#shard<n>') in the same table, picked at random. shard items also keep
+the date of every transaction in `trans_dates`, so readers can return the group item's own
+list followed by the shard lists merged back into transaction date order.
+"""
+import os
+import time
+import random
+from batch_get import batch_get_items
+
+SHARD_COUNT = int(os.environ.get('GROUP_SHARD_COUNT', 8))
+SHARD_PROMOTE_WRITES_PER_MIN = int(os.environ.get('SHARD_PROMOTE_WRITES_PER_MIN', 100))
+
+# group item attributes needed to route a write
+WRITE_ROUTING_ATTRS = ('shards', 'write_window', 'write_count')
+
+
+def shard_key(group_id, shard):
+    return f"{group_id}#shard{shard}"
+
+
+def is_shard_item(item):
+    return 'shard_of' in item
+
+
+def write_window():
+    """ current one minute rate tracking window """
+    return int(time.time() // 60)
+
+
+def pick_shard(group):
+    return random.randrange(int(group['shards']))
+
+
+def expected_write_count(group):
+    """ writes in the current window including the one about to happen, from the group item read before writing """
+    if group.get('write_window') == write_window():
+        return int(group.get('write_count', 0)) + 1
+    return 1
+
+
+def should_promote(group):
+    return not group.get('shards') and expected_write_count(group) > SHARD_PROMOTE_WRITES_PER_MIN
+
+
+def get_shard_transactions(ddb, table_name, group_id, shards):
+    """ transaction ids stored on the shard items of a sharded group, None on error """
+    keys = [{'group_id': shard_key(group_id, shard)} for shard in range(int(shards))]
+    # shard items are small, but batch_get_item may still return part of them as unprocessed
+    items = batch_get_items(ddb, table_name, keys, '#g, #t, #d',
+                            {'#g': 'group_id', '#t': 'transactions', '#d': 'trans_dates'})
+    if items is None:
+        print(f"Error in fetching shards of group_id {group_id}")
+        return None
+
+    dated = []
+    for item in sorted(items, key=lambda i: int(i['group_id'].rsplit('#shard', 1)[1])):
+        transactions = item.get('transactions', [])
+        dates = item.get('trans_dates', [])
+        # ids appended before dates were stored have none, they are the oldest of the shard
+        dates = [''] * (len(transactions) - len(dates)) + dates
+        dated.extend(zip(dates, transactions))
+    # stable sort, undated ids keep their shard order ahead of everything dated
+    dated.sort(key=lambda entry: entry[0])
+    return [trans_id for _, trans_id in dated]
+
+
+def group_transactions(ddb, table_name, group):
+    """ all transaction ids of a group item in transaction date order, merging in its shards when the group is sharded """
+    transactions = list(group.get('transactions', []))
+    if group.get('shards'):
+        shard_transactions = get_shard_transactions(ddb, table_name, group['group_id'], group['shards'])
+        if shard_transactions is None:
+            return None
+        transactions.extend(shard_transactions)
+    return transactions
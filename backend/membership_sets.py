@@ -0,0 +1,50 @@
+"""
+group membership - a user's `groups` and a group's `members` - is stored as string sets, so
+members are added and removed with constant size ADD / DELETE updates. items written before
+that hold lists, which ADD / DELETE reject with a ValidationException. the handlers convert
+such an item the first time they update it, tools/migrate_membership_sets.py converts every
+item up front.
+"""
+from botocore.exceptions import ClientError
+
+
+def list_to_set(table, key :dict, attr, values :list):
+    """
+    rewrites the list valued `attr` of the item at `key` as a string set (removed when empty).
+    returns False if the attribute is no longer a list, i.e. someone else converted it first.
+    other ClientErrors are raised.
+    """
+    update = {
+        'Key': key,
+        'ExpressionAttributeNames': {'#a': attr},
+        # only touch the attribute while it still is a list, nothing appends to the legacy lists
+        'ConditionExpression': 'attribute_type(#a, :list)',
+        'ExpressionAttributeValues': {':list': 'L'},
+    }
+    members = set(values)
+    if members:
+        update['UpdateExpression'] = 'SET #a = :members'
+        update['ExpressionAttributeValues'][':members'] = members
+    else:
+        update['UpdateExpression'] = 'REMOVE #a'
+    try:
+        table.update_item(**update)
+    except ClientError as err:
+        if err.response["Error"]["Code"] == 'ConditionalCheckFailedException':
+            return False
+        raise
+    return True
+
+
+def convert_to_set(table, key :dict, attr):
+    """ reads the item at `key` and converts a list valued `attr`, see list_to_set """
+    ret = table.get_item(
+        Key=key,
+        ProjectionExpression='#a',
+        ExpressionAttributeNames={'#a': attr},
+        ConsistentRead=True
+    )
+    values = ret.get('Item', {}).get(attr)
+    if not isinstance(values, list):
+        return False
+    return list_to_set(table, key, attr, values)
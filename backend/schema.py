@@ -0,0 +1,98 @@
+from math import isfinite
+from serializer import loads
+
+NUMBER = (int, float)
+
+_TYPE_NAMES = {str: 'a string', int: 'a number', float: 'a number', list: 'an array', dict: 'an object', bool: 'a boolean'}
+
+
+def field(types, required=True, items=None, values=None, min_items=0):
+    """
+    declares one request body field.
+    types     - allowed python type(s) of the value, matched exactly (True is not a number)
+    items     - allowed type(s) of every element when the value is a list
+    values    - allowed type(s) of every value when the value is a dict
+    min_items - minimum length of a list / dict value
+    """
+    return {
+        'types': _as_tuple(types),
+        'required': required,
+        'items': _as_tuple(items) if items is not None else None,
+        'values': _as_tuple(values) if values is not None else None,
+        'min_items': min_items
+    }
+
+
+def _as_tuple(types):
+    return types if isinstance(types, tuple) else (types,)
+
+
+def _describe(types):
+    return ' or '.join(dict.fromkeys(_TYPE_NAMES.get(t, t.__name__) for t in types))
+
+
+def compile_schema(fields :dict):
+    """
+    compiles a {name: field(...)} schema into a validator function.
+    the validator returns None for a valid body, otherwise a message naming the
+    first offending field. all lookups and messages are prepared here, once per
+    import, so validating a request is a single pass over the declared fields.
+    """
+    checks = []
+    for name, spec in fields.items():
+        checks.append((
+            name,
+            spec['required'],
+            spec['types'],
+            f"field '{name}' must be {_describe(spec['types'])}",
+            spec['items'],
+            f"every item of '{name}' must be {_describe(spec['items'])}" if spec['items'] else None,
+            spec['values'],
+            f"every value of '{name}' must be {_describe(spec['values'])}" if spec['values'] else None,
+            spec['min_items'],
+            f"field '{name}' needs at least {spec['min_items']} item(s)",
+            f"field '{name}' must be a finite number"
+        ))
+    checks = tuple(checks)
+
+    def validate(body):
+        if type(body) is not dict:
+            return 'request body must be a json object'
+        for name, required, types, type_err, items, items_err, values, values_err, min_items, min_err, finite_err in checks:
+            if name not in body:
+                if required:
+                    return f"missing required field '{name}'"
+                continue
+            value = body[name]
+            if type(value) not in types:
+                return type_err
+            # stdlib json parses NaN / Infinity into floats, they are never valid amounts
+            if type(value) is float and not isfinite(value):
+                return finite_err
+            if min_items and len(value) < min_items:
+                return min_err
+            if items is not None:
+                for item in value:
+                    if type(item) not in items or (type(item) is float and not isfinite(item)):
+                        return items_err
+            if values is not None:
+                for item in value.values():
+                    if type(item) not in values or (type(item) is float and not isfinite(item)):
+                        return values_err
+        return None
+
+    return validate
+
+
+def parse_body(event, validator):
+    """ returns (request_body, error message) for the json body of an api gateway event """
+    try:
+        request_body = loads(event.get('body'))
+    except Exception as e:
+        print(f"Error request body not valid json - {event.get('body')} | {e}")
+        return None, 'request body is not valid json'
+
+    error = validator(request_body)
+    if error is not None:
+        return None, error
+    return request_body, None
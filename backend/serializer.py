@@ -0,0 +1,37 @@
+import json
+from decimal import Decimal
+
+# orjson is a faster backend, bundled into the lambda asset by infra_stack.py. local runs without it fall back to the stdlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# shared by every response, treat as read only
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+
+def _default(obj):
+    # handlers convert amounts to strings when building a body, this only catches a Decimal that slips through
+    if type(obj) is Decimal:
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def dumps(obj) -> str:
+        return orjson.dumps(obj, default=_default).decode('utf-8')
+
+    loads = orjson.loads
+else:
+    # json.dumps() builds a new encoder on every call when given any option, reuse one instead
+    dumps = json.JSONEncoder(default=_default, separators=(',', ':')).encode
+    loads = json.loads
+
+
+def response(err_code :int, body :dict):
+    return {
+        'statusCode': err_code,
+        'headers': JSON_HEADERS,
+        'body': dumps(body)
+    }
@@ -0,0 +1,58 @@
+from collections import defaultdict
+
+
+def consolidate_payables(final_amounts):
+    """
+    reduces {user_id: net amount} (positive - is owed, negative - owes) to the minimum
+    set of payments, as {creditor: {debitor: amount}, debitor: {creditor: -amount}}.
+    returns None if the amounts do not add up to zero.
+    final_amounts is consumed (settled down to ~0) in the process.
+    """
+    total = 0
+    for user in final_amounts:
+        total += final_amounts[user]
+    if abs(total) >= 0.1:
+        print(f"final total amounts does not add up to 0 ({total}). mismatch - {final_amounts}")
+        return None
+
+    consolidated_payables = defaultdict(dict)
+    if final_amounts:
+        min_cash_flow(final_amounts, consolidated_payables)
+    return consolidated_payables
+
+
+def get_min_usr(amounts):
+    
+    minusr = next(iter(amounts))
+    for user in amounts:
+        if (amounts[user] < amounts[minusr]):
+            minusr = user
+    return minusr
+
+
+def get_max_usr(amounts):
+
+    maxusr = next(iter(amounts))
+    for user in amounts:
+        if (amounts[user] > amounts[maxusr]):
+            maxusr = user
+    return maxusr
+
+
+def min_cash_flow(amount, final_settle):
+
+    while True:
+        max_creditor = get_max_usr(amount)
+        min_debitor = get_min_usr(amount)
+
+        # If both amounts are 0 (or near, due to float precision), then all amounts are settled
+        if (abs(amount[max_creditor]) <= 0.1 and abs(amount[min_debitor]) <= 0.1):
+            return 0
+
+        min_amount = min(-amount[min_debitor], amount[max_creditor])
+        amount[max_creditor] -=min_amount
+        amount[min_debitor] += min_amount
+
+        # store the settlement details in defaultdict(dict)
+        final_settle[max_creditor][min_debitor] = round(min_amount, 2)
+        final_settle[min_debitor][max_creditor] = round(-min_amount, 2)
@@ -0,0 +1,232 @@
+import os
+import uuid
+import datetime
+import boto3
+from decimal import Decimal
+from botocore.exceptions import ClientError
+from boto3.dynamodb.types import TypeSerializer
+from schema import NUMBER, field, compile_schema, parse_body
+from serializer import dumps, response
+
+ddb = boto3.resource('dynamodb')
+group_table_name = os.environ.get('GROUP_TABLE')
+settle_table_name = os.environ.get('SETTLE_TABLE')
+
+try:
+    group_table = ddb.Table(group_table_name)
+    settle_table = ddb.Table(settle_table_name)
+except Exception as e:
+    print(f"error initializing table connection - {e}")
+
+serializer = TypeSerializer()
+
+NEW_SETTLEMENT = compile_schema({
+    'group_id': field(str),
+    'payer': field(str),
+    'payee': field(str),
+    'amount': field(NUMBER),
+    'details': field(str, required=False)
+})
+
+MAX_PAGE_SIZE = 100
+
+
+def lambda_handler(event :dict, context):
+    print(f"incoming event - {dumps(event)}")
+    http_method = event.get('httpMethod')
+    path_params = event.get('pathParameters') or {}
+
+    if http_method == 'POST':
+        return add_new_settlement(event)
+    elif http_method == 'GET' and 'settle_id' in path_params:
+        return ret_settlement_details(event)
+    elif http_method == 'GET':
+        return list_settlements(event)
+    else:
+        return response(405, {'error':'method not allowed'})
+
+
+def add_new_settlement(event):
+    request_body, error = parse_body(event, NEW_SETTLEMENT)
+    if error is not None:
+        return response(400, {'error': 'invalid parameters', 'details': error})
+
+    group_id = request_body['group_id']
+    payer = request_body['payer']
+    payee = request_body['payee']
+    # Float to decimal conv for ddb
+    amount = Decimal(str(request_body['amount']))
+    if amount <= 0:
+        return response(400, {'error': 'amount should be greater than 0'})
+    if payer == payee:
+        return response(400, {'error': 'payer and payee should be different users'})
+
+    now = datetime.datetime.now()
+    timestamp = now.isoformat()
+    # sort key starts with the timestamp so a group's settlements are listed in order
+    settle_id = f"{now.strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+
+    ret = record_payment(group_id, settle_id, {
+        'group_id': group_id,
+        'settle_id': settle_id,
+        'settle_date': timestamp,
+        'payer': payer,
+        'payee': payee,
+        'amount': amount,
+        # same shape as transactions, paying back moves the payer towards 0 from below
+        'payables': {payer: amount, payee: -amount},
+        'details': request_body.get('details', '')
+    })
+    if ret == 'invalid_group':
+        return response(400, {'error': 'invalid group, payer or payee'})
+    elif ret != 'ok':
+        return response(500, {'error': 'error recording settlement'})
+
+    return response(200, {'status': 'success', 'message': f'{payer} paid {amount} to {payee}', 'settle_id': settle_id})
+
+
+def record_payment(group_id, settle_id, item, retry=True):
+    """
+    stores the settlement record and applies it to the group's stored balances in one
+    transaction, a constant 2 item write however many transactions the group has.
+    returns 'ok', 'invalid_group' (group missing or payer/payee not members) or 'error'
+    """
+    payer = item['payer']
+    payee = item['payee']
+    amount = item['amount']
+    try:
+        ddb.meta.client.transact_write_items(
+            TransactItems=[
+                {
+                    'Put': {
+                        'TableName': settle_table_name,
+                        'Item': {k: serializer.serialize(v) for k, v in item.items()},
+                        'ConditionExpression': "attribute_not_exists(settle_id)"
+                    }
+                },
+                {
+                    'Update': {
+                        'TableName': group_table_name,
+                        'Key': {'group_id': {'S': group_id}},
+                        'UpdateExpression': "SET #b.#payer = if_not_exists(#b.#payer, :zero) + :amount, "
+                                            "#b.#payee = if_not_exists(#b.#payee, :zero) - :amount",
+                        'ConditionExpression': "contains(#m, :payer) AND contains(#m, :payee)",
+                        'ExpressionAttributeNames': {"#b": "balances", "#m": "members", "#payer": payer, "#payee": payee},
+                        'ExpressionAttributeValues': {
+                            ":zero": {'N': '0'},
+                            ":amount": serializer.serialize(amount),
+                            ":payer": {'S': payer},
+                            ":payee": {'S': payee}
+                        }
+                    }
+                }
+            ]
+        )
+    except ClientError as err:
+        if err.response["Error"]["Code"] == 'TransactionCanceledException':
+            reasons = [r.get('Code') for r in err.response.get('CancellationReasons', [])]
+            if len(reasons) == 2 and reasons[1] == 'ConditionalCheckFailed':
+                return 'invalid_group'
+            if len(reasons) == 2 and reasons[1] == 'ValidationError' and retry:
+                # groups created before balances were stored have no balances map yet
+                if init_balances(group_id):
+                    return record_payment(group_id, settle_id, item, retry=False)
+        print(f"Error in recording settlement {settle_id} for group {group_id} | {err}")
+        return 'error'
+    except Exception as e:
+        print(f"Error in recording settlement {settle_id} for group {group_id} | {e}")
+        return 'error'
+    return 'ok'
+
+
+def init_balances(group_id):
+    try:
+        group_table.update_item(
+            Key={
+                'group_id': group_id
+            },
+            UpdateExpression="SET #b = if_not_exists(#b, :empty)",
+            ExpressionAttributeNames={
+                "#b": "balances",
+            },
+            ExpressionAttributeValues={
+                ":empty": {}
+            },
+            ConditionExpression=boto3.dynamodb.conditions.Attr("group_id").exists()
+        )
+    except Exception as e:
+        print(f"Error in initializing balances for group {group_id} | {e}")
+        return False
+    return True
+
+
+def list_settlements(event):
+    path_params = event.get('pathParameters') or {}
+    if 'group_id' not in path_params:
+        return response(400, {'error': 'bad request'})
+    group_id = path_params['group_id']
+    query_params = event.get('queryStringParameters') or {}
+
+    try:
+        limit = max(1, min(int(query_params.get('limit', MAX_PAGE_SIZE)), MAX_PAGE_SIZE))
+    except ValueError:
+        return response(400, {'error': 'limit should be a number'})
+
+    query_kwargs = {
+        'KeyConditionExpression': boto3.dynamodb.conditions.Key('group_id').eq(group_id),
+        'Limit': limit
+    }
+    if 'user_id' in query_params:
+        user_id = query_params['user_id']
+        query_kwargs['FilterExpression'] = boto3.dynamodb.conditions.Attr('payer').eq(user_id) | \
+            boto3.dynamodb.conditions.Attr('payee').eq(user_id)
+    if 'next' in query_params:
+        query_kwargs['ExclusiveStartKey'] = {'group_id': group_id, 'settle_id': query_params['next']}
+
+    try:
+        ret = settle_table.query(**query_kwargs)
+    except Exception as e:
+        print(f"Error in listing settlements for group_id = {group_id} | {e}")
+        return response(500, {'error': 'unable to list settlements'})
+
+    body = {
+        'status': 'success',
+        'settlements': [settlement_details(item) for item in ret.get('Items', [])]
+    }
+    if 'LastEvaluatedKey' in ret:
+        body['next'] = ret['LastEvaluatedKey']['settle_id']
+    return response(200, body)
+
+
+def ret_settlement_details(event):
+    path_params = event.get('pathParameters') or {}
+    if 'group_id' not in path_params or 'settle_id' not in path_params:
+        return response(400, {'error': 'bad request'})
+    group_id = path_params['group_id']
+    settle_id = path_params['settle_id']
+    try:
+        ret = settle_table.get_item(
+            Key={
+                'group_id': group_id,
+                'settle_id': settle_id
+            }
+        )
+    except Exception as e:
+        print(f"Error in fetching ddb entry for key(group_id, settle_id) = {group_id}, {settle_id} | {e}")
+        return response(500, {'error': 'unable to find details'})
+
+    if 'Item' not in ret:
+        return response(400, {'message': 'provided settle_id not found'})
+
+    return response(200, {'status': 'success', **settlement_details(ret['Item'])})
+
+
+def settlement_details(item):
+    return {
+        'settle_id': item['settle_id'],
+        'settle_date': item['settle_date'],
+        'payer': item['payer'],
+        'payee': item['payee'],
+        'amount': str(item['amount']),
+        'details': item.get('details', '')
+    }
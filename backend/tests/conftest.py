@@ -0,0 +1,8 @@
+import os
+
+# handler modules create their boto3 resources and read table names at import
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-south-1')
+os.environ.setdefault('USER_TABLE', 'splitwise_registered_users')
+os.environ.setdefault('GROUP_TABLE', 'splitwise_user_groups')
+os.environ.setdefault('TRANS_TABLE', 'splitwise_transactions')
+os.environ.setdefault('SETTLE_TABLE', 'splitwise_settlements')
@@ -0,0 +1,57 @@
+from decimal import Decimal
+
+from group_balances import get_payables, net_amounts
+
+
+class FakeDdb:
+    """ BatchGetItem over in memory tables, returns at most `page` items per call and the rest as unprocessed """
+
+    def __init__(self, tables, page=1000):
+        self.tables = tables
+        self.page = page
+        self.requests = []
+
+    def batch_get_item(self, RequestItems):
+        (table_name, request), = RequestItems.items()
+        self.requests.append(len(request['Keys']))
+        assert len(request['Keys']) <= 100
+        table = self.tables[table_name]
+        key_name = 'trans_id' if table_name == 'trans' else 'group_id'
+        served, rest = request['Keys'][:self.page], request['Keys'][self.page:]
+        ret = {'Responses': {table_name: [table[k[key_name]] for k in served if k[key_name] in table]}}
+        if rest:
+            ret['UnprocessedKeys'] = {table_name: dict(request, Keys=rest)}
+        return ret
+
+
+def transactions(count):
+    return {f't{n}': {'trans_id': f't{n}', 'payables': {'a': Decimal(2), 'b': Decimal(-2)}} for n in range(count)}
+
+
+def test_get_payables_batches_of_100():
+    ddb = FakeDdb({'trans': transactions(250)})
+    assert len(get_payables(ddb, 'trans', [f't{n}' for n in range(250)])) == 250
+    assert ddb.requests == [100, 100, 50]
+
+
+def test_get_payables_missing_transaction():
+    ddb = FakeDdb({'trans': transactions(3)})
+    assert get_payables(ddb, 'trans', ['t0', 't1', 'gone']) is None
+
+
+def test_get_payables_unprocessed_keys(monkeypatch):
+    import batch_get
+    monkeypatch.setattr(batch_get.time, 'sleep', lambda seconds: None)
+    ddb = FakeDdb({'trans': transactions(10)}, page=4)
+    assert len(get_payables(ddb, 'trans', [f't{n}' for n in range(10)])) == 10
+    assert ddb.requests == [10, 6, 2]
+
+
+def test_net_amounts_adds_recorded_settlements():
+    ddb = FakeDdb({'trans': transactions(3)})
+    group = {'group_id': 'g1', 'transactions': ['t0', 't1', 't2'], 'balances': {'b': Decimal(5), 'a': Decimal(-5)}}
+    assert net_amounts(ddb, 'groups', 'trans', group) == {'a': Decimal(1), 'b': Decimal(-1)}
+
+
+def test_net_amounts_empty_group():
+    assert net_amounts(FakeDdb({'trans': {}}), 'groups', 'trans', {'group_id': 'g1'}) == {}
@@ -0,0 +1,136 @@
+from decimal import Decimal
+from types import SimpleNamespace
+
+from botocore.exceptions import ClientError
+
+import group_mgr
+
+
+def client_error(code, reasons=None, operation='UpdateItem'):
+    error = {'Error': {'Code': code, 'Message': code}}
+    if reasons is not None:
+        error['CancellationReasons'] = [{'Code': reason} for reason in reasons]
+    return ClientError(error, operation)
+
+
+class FakeClient:
+    """ transact_write_items raising the queued errors in order, then succeeding """
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = []
+
+    def transact_write_items(self, TransactItems):
+        self.calls.append(TransactItems)
+        if self.errors:
+            raise self.errors.pop(0)
+
+
+class FakeUserTable:
+    """ users keyed by user_id, enough of update_item to model ADD / DELETE on sets and lists """
+
+    def __init__(self, users, fail=None):
+        self.users = users
+        self.fail = fail or {}
+        self.updates = []
+
+    def get_item(self, Key, **kwargs):
+        user = self.users.get(Key['user_id'])
+        return {'Item': dict(user)} if user is not None else {}
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues, **kwargs):
+        self.updates.append((Key['user_id'], UpdateExpression))
+        user_id = Key['user_id']
+        if user_id in self.fail:
+            raise self.fail[user_id]
+        if user_id not in self.users:
+            raise client_error('ConditionalCheckFailedException')
+        user = self.users[user_id]
+        if UpdateExpression.startswith('SET'):
+            user['groups'] = ExpressionAttributeValues[':members']
+        elif UpdateExpression.startswith('REMOVE'):
+            user.pop('groups', None)
+        elif isinstance(user.get('groups'), list):
+            raise client_error('ValidationException')
+        elif UpdateExpression.startswith('ADD'):
+            user['groups'] = user.get('groups', set()) | ExpressionAttributeValues[':groupid']
+        else:
+            user['groups'] = user.get('groups', set()) - ExpressionAttributeValues[':groupid']
+
+
+def test_update_membership_ok(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(group_mgr, 'ddb', SimpleNamespace(meta=SimpleNamespace(client=client)))
+    assert group_mgr.update_membership('g1', 'u1', 'ADD') == 'ok'
+    user_update, group_update = (item['Update'] for item in client.calls[0])
+    assert user_update['Key'] == {'user_id': {'S': 'u1'}}
+    assert group_update['Key'] == {'group_id': {'S': 'g1'}}
+
+
+def test_update_membership_cancellation_reasons(monkeypatch):
+    cases = [
+        (['None', 'ConditionalCheckFailed'], 'invalid_group'),
+        (['ConditionalCheckFailed', 'None'], 'invalid_user'),
+        (['ConditionalCheckFailed', 'ConditionalCheckFailed'], 'invalid_group'),
+        (['TransactionConflict', 'None'], 'error'),
+    ]
+    for reasons, expected in cases:
+        client = FakeClient(client_error('TransactionCanceledException', reasons, 'TransactWriteItems'))
+        monkeypatch.setattr(group_mgr, 'ddb', SimpleNamespace(meta=SimpleNamespace(client=client)))
+        assert group_mgr.update_membership('g1', 'u1', 'DELETE') == expected, reasons
+
+
+def test_update_membership_converts_legacy_lists(monkeypatch):
+    client = FakeClient(client_error('TransactionCanceledException', ['ValidationError', 'None'], 'TransactWriteItems'))
+    monkeypatch.setattr(group_mgr, 'ddb', SimpleNamespace(meta=SimpleNamespace(client=client)))
+    converted = []
+    monkeypatch.setattr(group_mgr, 'convert_to_set', lambda table, key, attr: converted.append((key, attr)))
+    assert group_mgr.update_membership('g1', 'u1', 'ADD') == 'ok'
+    assert converted == [({'user_id': 'u1'}, 'groups'), ({'group_id': 'g1'}, 'members')]
+    assert len(client.calls) == 2
+
+
+def test_update_membership_retries_conversion_once(monkeypatch):
+    error = client_error('TransactionCanceledException', ['ValidationError', 'None'], 'TransactWriteItems')
+    client = FakeClient(error, error)
+    monkeypatch.setattr(group_mgr, 'ddb', SimpleNamespace(meta=SimpleNamespace(client=client)))
+    monkeypatch.setattr(group_mgr, 'convert_to_set', lambda table, key, attr: None)
+    assert group_mgr.update_membership('g1', 'u1', 'ADD') == 'error'
+    assert len(client.calls) == 2
+
+
+def test_update_user_table_converts_legacy_lists(monkeypatch):
+    users = FakeUserTable({'u1': {'groups': []}, 'u2': {'groups': ['g0']}, 'u3': {'groups': {'g0'}}})
+    monkeypatch.setattr(group_mgr, 'user_table', users)
+    assert group_mgr.update_user_table(['u1', 'u2', 'u3', 'missing'], 'g1') == ['u1', 'u2', 'u3']
+    assert users.users == {'u1': {'groups': {'g1'}}, 'u2': {'groups': {'g0', 'g1'}}, 'u3': {'groups': {'g0', 'g1'}}}
+
+
+def test_update_user_table_rolls_back_on_error(monkeypatch):
+    users = FakeUserTable({'u1': {'groups': {'g0'}}, 'u2': {}, 'u3': {}},
+                          fail={'u3': client_error('ProvisionedThroughputExceededException')})
+    monkeypatch.setattr(group_mgr, 'user_table', users)
+    assert group_mgr.update_user_table(['u1', 'u2', 'u3'], 'g1') is None
+    assert users.users['u1'] == {'groups': {'g0'}}
+    assert users.users['u2'] == {'groups': set()}
+
+
+def remove(monkeypatch, balance, membership):
+    calls = []
+    monkeypatch.setattr(group_mgr, 'member_balance', lambda group_id, user_id: balance)
+    monkeypatch.setattr(group_mgr, 'update_membership', lambda *args: calls.append(args) or membership)
+    event = {'httpMethod': 'DELETE', 'resource': '/groups/{group_id}/members/{user_id}',
+             'pathParameters': {'group_id': 'g1', 'user_id': 'u1'}}
+    return group_mgr.lambda_handler(event, None)['statusCode'], calls
+
+
+def test_remove_member_with_balance(monkeypatch):
+    assert remove(monkeypatch, Decimal('-12.5'), 'ok') == (400, [])
+
+
+def test_remove_member(monkeypatch):
+    assert remove(monkeypatch, Decimal('0.01'), 'ok') == (200, [('g1', 'u1', 'DELETE')])
+    assert remove(monkeypatch, 0, 'invalid_user')[0] == 400
+    assert remove(monkeypatch, 0, 'invalid_group')[0] == 400
+    assert remove(monkeypatch, 0, 'error')[0] == 500
+    assert remove(monkeypatch, None, 'ok') == (500, [])
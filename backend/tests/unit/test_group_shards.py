@@ -0,0 +1,101 @@
+import batch_get
+import group_shards
+from group_shards import (SHARD_PROMOTE_WRITES_PER_MIN, shard_key, is_shard_item, expected_write_count,
+                          should_promote, get_shard_transactions, group_transactions)
+
+
+def freeze_window(monkeypatch, window):
+    monkeypatch.setattr(group_shards.time, 'time', lambda: window * 60 + 30)
+
+
+def test_shard_key():
+    assert shard_key('e2e44673', 3) == 'e2e44673#shard3'
+    assert is_shard_item({'group_id': 'e2e44673#shard3', 'shard_of': 'e2e44673'})
+    assert not is_shard_item({'group_id': 'e2e44673'})
+
+
+def test_expected_write_count_same_window(monkeypatch):
+    freeze_window(monkeypatch, 1000)
+    assert expected_write_count({'write_window': 1000, 'write_count': 41}) == 42
+
+
+def test_expected_write_count_new_window(monkeypatch):
+    freeze_window(monkeypatch, 1001)
+    assert expected_write_count({'write_window': 1000, 'write_count': 41}) == 1
+    assert expected_write_count({}) == 1
+
+
+def test_should_promote_across_windows(monkeypatch):
+    group = {'write_window': 1000, 'write_count': SHARD_PROMOTE_WRITES_PER_MIN}
+    freeze_window(monkeypatch, 1000)
+    assert should_promote(group)
+    # the busy minute is over, the count starts again
+    freeze_window(monkeypatch, 1001)
+    assert not should_promote(group)
+
+
+def test_should_promote_below_threshold(monkeypatch):
+    freeze_window(monkeypatch, 1000)
+    assert not should_promote({'write_window': 1000, 'write_count': SHARD_PROMOTE_WRITES_PER_MIN - 1})
+
+
+def test_should_promote_already_sharded(monkeypatch):
+    freeze_window(monkeypatch, 1000)
+    assert not should_promote({'shards': 8, 'write_window': 1000, 'write_count': 10 * SHARD_PROMOTE_WRITES_PER_MIN})
+
+
+class FakeDdb:
+    """ batch_get_item returning one shard item per call, the rest as unprocessed """
+
+    def __init__(self, items, table_name):
+        self.items = {item['group_id']: item for item in items}
+        self.table_name = table_name
+        self.calls = 0
+
+    def batch_get_item(self, RequestItems):
+        self.calls += 1
+        keys = RequestItems[self.table_name]['Keys']
+        ret = {'Responses': {self.table_name: [self.items[keys[0]['group_id']]]}}
+        if len(keys) > 1:
+            ret['UnprocessedKeys'] = {self.table_name: dict(RequestItems[self.table_name], Keys=keys[1:])}
+        return ret
+
+
+def test_get_shard_transactions_retries_with_backoff(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(batch_get.time, 'sleep', sleeps.append)
+    ddb = FakeDdb([{'group_id': shard_key('g', n), 'transactions': [f't{n}']} for n in range(3)], 'groups')
+    assert get_shard_transactions(ddb, 'groups', 'g', 3) == ['t0', 't1', 't2']
+    assert ddb.calls == 3
+    assert sleeps == [0.05, 0.1]
+
+
+def test_get_shard_transactions_gives_up(monkeypatch):
+    monkeypatch.setattr(batch_get.time, 'sleep', lambda seconds: None)
+    ddb = FakeDdb([{'group_id': shard_key('g', n), 'transactions': []} for n in range(8)], 'groups')
+    assert get_shard_transactions(ddb, 'groups', 'g', 8) is None
+
+
+def test_group_transactions_unsharded():
+    assert group_transactions(None, 'groups', {'group_id': 'g', 'transactions': ['a', 'b']}) == ['a', 'b']
+
+
+def test_shard_transactions_in_date_order(monkeypatch):
+    monkeypatch.setattr(batch_get.time, 'sleep', lambda seconds: None)
+    ddb = FakeDdb([
+        {'group_id': shard_key('g', 0), 'transactions': ['t2', 't5'], 'trans_dates': ['2021-01-02', '2021-01-05']},
+        {'group_id': shard_key('g', 1), 'transactions': ['t1', 't3', 't4'],
+         'trans_dates': ['2021-01-01', '2021-01-03', '2021-01-04']},
+    ], 'groups')
+    group = {'group_id': 'g', 'shards': 2, 'transactions': ['t0']}
+    assert group_transactions(ddb, 'groups', group) == ['t0', 't1', 't2', 't3', 't4', 't5']
+
+
+def test_shard_transactions_without_dates(monkeypatch):
+    monkeypatch.setattr(batch_get.time, 'sleep', lambda seconds: None)
+    ddb = FakeDdb([
+        # two ids appended before dates were stored, then one with a date
+        {'group_id': shard_key('g', 0), 'transactions': ['old0', 'old1', 't2'], 'trans_dates': ['2021-01-02']},
+        {'group_id': shard_key('g', 1), 'transactions': ['old2', 't1'], 'trans_dates': ['2021-01-01']},
+    ], 'groups')
+    assert get_shard_transactions(ddb, 'groups', 'g', 2) == ['old0', 'old1', 'old2', 't1', 't2']
@@ -0,0 +1,57 @@
+from schema import NUMBER, field, compile_schema, parse_body
+
+TRANSACTION = compile_schema({
+    'name': field(str),
+    'total_amount': field(NUMBER),
+    'participants': field(list, items=str, min_items=1),
+    'payers': field(dict, values=NUMBER, min_items=1),
+    'details': field(str, required=False)
+})
+
+
+def valid_body(**overrides):
+    body = {'name': 'trip', 'total_amount': 300, 'participants': ['a', 'b', 'c'], 'payers': {'a': 300}}
+    body.update(overrides)
+    return body
+
+
+def test_valid_body():
+    assert TRANSACTION(valid_body()) is None
+    assert TRANSACTION(valid_body(total_amount=300.5, details='dinner')) is None
+
+
+def test_missing_and_optional_fields():
+    body = valid_body()
+    del body['payers']
+    assert TRANSACTION(body) == "missing required field 'payers'"
+    assert TRANSACTION(valid_body(details=1)) == "field 'details' must be a string"
+
+
+def test_body_must_be_object():
+    assert TRANSACTION([1, 2]) == 'request body must be a json object'
+    assert TRANSACTION(None) == 'request body must be a json object'
+
+
+def test_bool_is_not_a_number():
+    assert TRANSACTION(valid_body(total_amount=True)) == "field 'total_amount' must be a number"
+    assert TRANSACTION(valid_body(payers={'a': True})) == "every value of 'payers' must be a number"
+
+
+def test_non_finite_numbers_rejected():
+    assert TRANSACTION(valid_body(total_amount=float('nan'))) == "field 'total_amount' must be a finite number"
+    assert TRANSACTION(valid_body(total_amount=float('inf'))) == "field 'total_amount' must be a finite number"
+    assert TRANSACTION(valid_body(payers={'a': float('-inf')})) == "every value of 'payers' must be a number"
+
+
+def test_items_and_min_items():
+    assert TRANSACTION(valid_body(participants=[])) == "field 'participants' needs at least 1 item(s)"
+    assert TRANSACTION(valid_body(participants=['a', 2])) == "every item of 'participants' must be a string"
+    assert TRANSACTION(valid_body(payers={})) == "field 'payers' needs at least 1 item(s)"
+
+
+def test_parse_body():
+    assert parse_body({'body': 'not json'}, TRANSACTION) == (None, 'request body is not valid json')
+    assert parse_body({'body': None}, TRANSACTION) == (None, 'request body is not valid json')
+    assert parse_body({'body': '{"name": "trip"}'}, TRANSACTION) == (None, "missing required field 'total_amount'")
+    body, error = parse_body({'body': '{"name": "trip", "total_amount": NaN, "participants": ["a"], "payers": {"a": 1}}'}, TRANSACTION)
+    assert body is None and error is not None
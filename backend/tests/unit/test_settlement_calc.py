@@ -0,0 +1,31 @@
+from decimal import Decimal
+
+from settlement_calc import consolidate_payables
+
+
+def test_empty_input():
+    assert consolidate_payables({}) == {}
+
+
+def test_mismatched_totals():
+    assert consolidate_payables({'a': 100, 'b': -50}) is None
+
+
+def test_decimal_input():
+    consolidated = consolidate_payables({'a': Decimal('150.50'), 'b': Decimal('-100.25'), 'c': Decimal('-50.25')})
+    assert consolidated == {
+        'a': {'b': Decimal('100.25'), 'c': Decimal('50.25')},
+        'b': {'a': Decimal('-100.25')},
+        'c': {'a': Decimal('-50.25')},
+    }
+    assert all(type(amount) is Decimal for payables in consolidated.values() for amount in payables.values())
+
+
+def test_float_input():
+    consolidated = consolidate_payables({'a': 100.0, 'b': -33.33, 'c': -33.33, 'd': -33.34})
+    assert sum(consolidated['a'].values()) == 100.0
+    assert set(consolidated['a']) == {'b', 'c', 'd'}
+
+
+def test_already_settled():
+    assert consolidate_payables({'a': 0, 'b': 0}) == {}
@@ -0,0 +1,73 @@
+from decimal import Decimal
+from types import SimpleNamespace
+
+from botocore.exceptions import ClientError
+
+import settlements_mgr
+
+
+def client_error(code, reasons):
+    return ClientError({'Error': {'Code': code, 'Message': code},
+                        'CancellationReasons': [{'Code': reason} for reason in reasons]}, 'TransactWriteItems')
+
+
+class FakeClient:
+    """ transact_write_items raising the queued errors in order, then succeeding """
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = []
+
+    def transact_write_items(self, TransactItems):
+        self.calls.append(TransactItems)
+        if self.errors:
+            raise self.errors.pop(0)
+
+
+ITEM = {'group_id': 'g1', 'settle_id': 's1', 'payer': 'a', 'payee': 'b', 'amount': Decimal('10.5'),
+        'payables': {'a': Decimal('10.5'), 'b': Decimal('-10.5')}}
+
+
+def record(monkeypatch, *errors, init_ok=True):
+    client = FakeClient(*errors)
+    monkeypatch.setattr(settlements_mgr, 'ddb', SimpleNamespace(meta=SimpleNamespace(client=client)))
+    inits = []
+    monkeypatch.setattr(settlements_mgr, 'init_balances', lambda group_id: inits.append(group_id) or init_ok)
+    return settlements_mgr.record_payment('g1', 's1', dict(ITEM)), client, inits
+
+
+def test_record_payment_ok(monkeypatch):
+    ret, client, inits = record(monkeypatch)
+    assert ret == 'ok' and inits == []
+    put, update = client.calls[0]
+    assert put['Put']['Item']['amount'] == {'N': '10.5'}
+    assert update['Update']['Key'] == {'group_id': {'S': 'g1'}}
+
+
+def test_record_payment_not_members(monkeypatch):
+    ret, client, inits = record(monkeypatch, client_error('TransactionCanceledException', ['None', 'ConditionalCheckFailed']))
+    assert ret == 'invalid_group' and inits == []
+
+
+def test_record_payment_duplicate_settle_id(monkeypatch):
+    ret, client, inits = record(monkeypatch, client_error('TransactionCanceledException', ['ConditionalCheckFailed', 'None']))
+    assert ret == 'error'
+
+
+def test_record_payment_initializes_missing_balances(monkeypatch):
+    ret, client, inits = record(monkeypatch, client_error('TransactionCanceledException', ['None', 'ValidationError']))
+    assert ret == 'ok'
+    assert inits == ['g1'] and len(client.calls) == 2
+
+
+def test_record_payment_retries_once(monkeypatch):
+    error = client_error('TransactionCanceledException', ['None', 'ValidationError'])
+    ret, client, inits = record(monkeypatch, error, error)
+    assert ret == 'error'
+    assert inits == ['g1'] and len(client.calls) == 2
+
+
+def test_record_payment_init_fails(monkeypatch):
+    ret, client, inits = record(monkeypatch, client_error('TransactionCanceledException', ['None', 'ValidationError']),
+                                init_ok=False)
+    assert ret == 'error' and len(client.calls) == 1
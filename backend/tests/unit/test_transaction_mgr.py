@@ -0,0 +1,70 @@
+import json
+from decimal import Decimal
+
+from boto3.dynamodb.types import TypeSerializer
+
+import transaction_mgr
+
+
+class FakeTable:
+    def __init__(self, items=()):
+        self.items = {item['group_id']: item for item in items}
+        self.updates = []
+        self.puts = []
+
+    def get_item(self, Key, **kwargs):
+        item = self.items.get(Key['group_id'])
+        return {'Item': item} if item else {}
+
+    def update_item(self, **kwargs):
+        self.updates.append(kwargs)
+
+    def put_item(self, Item):
+        # the same check boto3 runs before sending the item
+        for value in Item.values():
+            TypeSerializer().serialize(value)
+        self.puts.append(Item)
+
+
+def post(monkeypatch, body):
+    group_table = FakeTable([{'group_id': 'g1', 'members': {'a', 'b', 'c'}}])
+    trans_table = FakeTable()
+    monkeypatch.setattr(transaction_mgr, 'group_table', group_table)
+    monkeypatch.setattr(transaction_mgr, 'trans_table', trans_table)
+    ret = transaction_mgr.lambda_handler({'httpMethod': 'POST', 'body': json.dumps(body)}, None)
+    return ret, group_table, trans_table
+
+
+def test_fractional_amounts_are_written_as_decimal(monkeypatch):
+    ret, group_table, trans_table = post(monkeypatch, {
+        'name': 'dinner', 'group_id': 'g1', 'total_amount': 100.5,
+        'participants': ['a', 'b', 'c'], 'payers': {'a': 60.25, 'b': 40.25}
+    })
+    assert ret['statusCode'] == 200
+    assert len(group_table.updates) == 1
+    item = trans_table.puts[0]
+    assert item['total_amount'] == Decimal('100.5')
+    assert item['payers'] == {'a': Decimal('60.25'), 'b': Decimal('40.25')}
+    assert item['payables']['c'] == Decimal('-33.5')
+    assert json.loads(ret['body'])['trans_id'] == item['trans_id']
+
+
+def test_total_mismatch_leaves_group_untouched(monkeypatch):
+    ret, group_table, trans_table = post(monkeypatch, {
+        'name': 'dinner', 'group_id': 'g1', 'total_amount': 100.5,
+        'participants': ['a', 'b'], 'payers': {'a': 100}
+    })
+    assert ret['statusCode'] == 400
+    assert group_table.updates == [] and trans_table.puts == []
+
+
+def test_sharded_group_stores_transaction_date(monkeypatch):
+    group_table = FakeTable([{'group_id': 'g1', 'members': {'a', 'b'}, 'shards': 4}])
+    monkeypatch.setattr(transaction_mgr, 'group_table', group_table)
+    monkeypatch.setattr(transaction_mgr, 'trans_table', FakeTable())
+    body = {'name': 'taxi', 'group_id': 'g1', 'total_amount': 10, 'participants': ['a', 'b'], 'payers': {'a': 10}}
+    ret = transaction_mgr.lambda_handler({'httpMethod': 'POST', 'body': json.dumps(body)}, None)
+    assert ret['statusCode'] == 200
+    update = group_table.updates[0]
+    assert update['Key']['group_id'].startswith('g1#shard')
+    assert update['ExpressionAttributeValues'][':date'] == [transaction_mgr.trans_table.puts[0]['trans_date']]
@@ -6,6 +6,9 @@ import boto3
 from collections import defaultdict
 from decimal import Decimal
 from botocore.exceptions import ClientError
+from schema import NUMBER, field, compile_schema, parse_body
+from serializer import dumps, response
+from group_shards import WRITE_ROUTING_ATTRS, SHARD_COUNT, shard_key, is_shard_item, write_window, pick_shard, should_promote
 
 ddb = boto3.resource('dynamodb')
 user_table_name = os.environ.get('USER_TABLE')
@@ -19,9 +22,22 @@ try:
 except Exception as e:
     print(f"error initializing table connection - {e}")
 
+NEW_TRANSACTION = compile_schema({
+    'name': field(str),
+    'total_amount': field(NUMBER),
+    'group_id': field(str),
+    'participants': field(list, items=str, min_items=1),
+    'payers': field(dict, values=NUMBER, min_items=1),
+    'details': field(str, required=False)
+})
+
+# worth retrying by the client, answered with 503
+RETRYABLE_ERRORS = ('ProvisionedThroughputExceededException', 'ThrottlingException',
+                    'RequestLimitExceeded', 'TransactionConflictException')
+
 
 def lambda_handler(event :dict, context):
-    print(f"incoming event - {json.dumps(event)}")
+    print(f"incoming event - {dumps(event)}")
     http_method = event.get('httpMethod')
 
     if http_method == 'POST':
@@ -31,29 +47,24 @@ def lambda_handler(event :dict, context):
 
 
 def add_new_transaction(event):
-    try:
-        request_body = json.loads(event.get('body'))
-    except Exception as e:
-        print(f"Error request body not valid json - {event.get('body')} | {e}")
-        return response(400, {'error': 'invalid parameters'})
-
-    # validate request params
-    if 'name' not in request_body or 'total_amount' not in request_body or 'group_id' not in request_body or \
-    'participants' not in request_body or type(request_body['participants']) is not list or \
-    'payers' not in request_body or type(request_body['payers']) is not dict:
-        return response(400, {'error': 'invalid parameters'})
+    request_body, error = parse_body(event, NEW_TRANSACTION)
+    if error is not None:
+        return response(400, {'error': 'invalid parameters', 'details': error})
 
     transaction_id = uuid.uuid4().hex
     timestamp = datetime.datetime.now().isoformat()
     participants = request_body['participants']
     payers = request_body['payers']
 
-    if not validate_group(request_body['group_id']):
+    group = get_group(request_body['group_id'])
+    if group is None:
         return response(400, {'error': 'invalid group'})
+    # members is a string set, groups written before the switch from lists are converted here
+    group_members = set(group.get('members', ()))
 
-    if not validate_users(participants, request_body['group_id']):
+    if not validate_users(participants, group_members):
         return response(400, {'error': 'invalid participants list'})
-    if not validate_users(payers.keys(), request_body['group_id']):
+    if not validate_users(payers.keys(), group_members):
         return response(400, {'error': 'invalid payers list'})
 
     payers_sum = 0
@@ -62,12 +73,18 @@ def add_new_transaction(event):
     if payers_sum != request_body['total_amount']:
         return response(400, {'error': 'total_amount mismatch'})
     
-    if not add_trans_to_group(request_body['group_id'], transaction_id):
+    ret = add_trans_to_group(group, transaction_id, timestamp)
+    if ret == 'invalid_group':
         return response(400, {'error': 'group_id invalid'})
+    elif ret == 'throttled':
+        return response(503, {'error': 'group is busy, retry the transaction'})
+    elif ret != 'ok':
+        return response(500, {'error': 'error adding new transaction'})
 
     resolved_payables = calculate_balances(request_body['total_amount'], payers, participants)
-    # Float to deciman conv for ddb
+    # Float to deciman conv for ddb, boto3 rejects floats
     ddb_resolved_payables = json.loads(json.dumps(resolved_payables), parse_float=Decimal)
+    ddb_payers = {user_id: Decimal(str(amount)) for user_id, amount in payers.items()}
 
     try:
         trans_table.put_item(
@@ -75,9 +92,9 @@ def add_new_transaction(event):
                 'trans_id': transaction_id,
                 'name': request_body['name'],
                 'trans_date': timestamp,
-                'payers': payers,
+                'payers': ddb_payers,
                 'participants': participants,
-                'total_amount': request_body['total_amount'],
+                'total_amount': Decimal(str(request_body['total_amount'])),
                 'group_id': request_body['group_id'],
                 'payables': ddb_resolved_payables,
                 'details': request_body.get('details', '')
@@ -101,69 +118,135 @@ def calculate_balances(total_amount, payers, participants):
     return payables
 
 
-def add_trans_to_group(groupid, transactionid):
+def add_trans_to_group(group, transactionid, timestamp):
+    """ returns 'ok', 'invalid_group', 'throttled' or 'error' """
+    groupid = group['group_id']
+    if group.get('shards'):
+        return add_trans_to_shard(group, transactionid, timestamp)
+
+    # track the write rate on the same update, so unsharded groups pay no extra write for it
+    window = write_window()
+    if group.get('write_window') == window:
+        update_expr = "SET #g = list_append(#g, :transid), #ww = :window ADD #wc :one"
+    else:
+        update_expr = "SET #g = list_append(#g, :transid), #ww = :window, #wc = :one"
     try:
         group_table.update_item(
                 Key={
                     'group_id': groupid
                 },
-                UpdateExpression="SET #g = list_append(#g, :transid)",
+                UpdateExpression=update_expr,
                 ExpressionAttributeNames={
                     "#g": "transactions",
+                    "#ww": "write_window",
+                    "#wc": "write_count"
                 },
                 ExpressionAttributeValues={
-                    ":transid": [transactionid]
+                    ":transid": [transactionid],
+                    ":window": window,
+                    ":one": 1
                 },
                 ConditionExpression=boto3.dynamodb.conditions.Attr("group_id").exists()
             )
     except ClientError as err:
         if err.response["Error"]["Code"] == 'ConditionalCheckFailedException':
-            # user_id does not exist
             print(f"group_id - {groupid} not found")
+            return 'invalid_group'
+        print(f"Error occured in updating group table for {groupid} | {err}")
+        return write_error(err)
 
     except Exception as e:
         print(f"Error occured in updating user table for {groupid} | {e}")
-        return False
-    return True
+        return 'error'
 
+    if should_promote(group):
+        promote_group(groupid)
+    return 'ok'
 
-def validate_group(groupid):
+
+def add_trans_to_shard(group, transactionid, timestamp):
+    groupid = group['group_id']
+    shard = pick_shard(group)
     try:
-        ret = group_table.get_item(
-            Key = {
-                'group_id': groupid
-            }
-        )
-        if 'Item' not in ret:
-            return False
+        group_table.update_item(
+                Key={
+                    'group_id': shard_key(groupid, shard)
+                },
+                # the date orders this shard's ids among the other shards' on read
+                UpdateExpression="SET #g = list_append(if_not_exists(#g, :empty), :transid), "
+                                 "#d = list_append(if_not_exists(#d, :empty), :date), shard_of = :groupid",
+                ExpressionAttributeNames={
+                    "#g": "transactions",
+                    "#d": "trans_dates"
+                },
+                ExpressionAttributeValues={
+                    ":transid": [transactionid],
+                    ":date": [timestamp],
+                    ":empty": [],
+                    ":groupid": groupid
+                }
+            )
+    except ClientError as err:
+        print(f"Error occured in updating shard {shard} of group {groupid} | {err}")
+        return write_error(err)
     except Exception as e:
-        print(f"Error in validating group_id {groupid} | {e}")
-        return False
-    return True
+        print(f"Error occured in updating shard {shard} of group {groupid} | {e}")
+        return 'error'
+    return 'ok'
+
+
+def write_error(err):
+    return 'throttled' if err.response["Error"]["Code"] in RETRYABLE_ERRORS else 'error'
+
 
-def validate_users(users, groupid):
+def promote_group(groupid):
+    """ switches a hot group to the sharded layout, transactions already on the group item stay there """
+    try:
+        group_table.update_item(
+                Key={
+                    'group_id': groupid
+                },
+                UpdateExpression="SET shards = :shards",
+                ExpressionAttributeValues={
+                    ":shards": SHARD_COUNT
+                },
+                ConditionExpression=boto3.dynamodb.conditions.Attr("shards").not_exists()
+            )
+    except ClientError as err:
+        if err.response["Error"]["Code"] != 'ConditionalCheckFailedException':
+            print(f"Error in promoting group {groupid} to {SHARD_COUNT} shards | {err}")
+        # else another writer promoted it first
+        return
+    except Exception as e:
+        print(f"Error in promoting group {groupid} to {SHARD_COUNT} shards | {e}")
+        return
+    print(f"group {groupid} promoted to {SHARD_COUNT} write shards")
+
+
+def get_group(groupid):
+    """ returns the group attributes needed to validate and route a new transaction, None if the group does not exist """
     try:
         ret = group_table.get_item(
             Key = {
                 'group_id': groupid
+            },
+            ProjectionExpression=', '.join(('group_id', '#m', 'shard_of') + WRITE_ROUTING_ATTRS),
+            ExpressionAttributeNames={
+                "#m": "members"
             }
         )
-        if 'Item' not in ret:
-            return False
+        # shard items share the table but are not groups
+        if 'Item' not in ret or is_shard_item(ret['Item']):
+            return None
     except Exception as e:
         print(f"Error in reading db for group_id {groupid} | {e}")
-        return False
-    
-    group_users = ret['Item']['members']
+        return None
+    return ret['Item']
+
+
+def validate_users(users, group_members):
     for user_id in users:
-        if user_id not in group_users:
-            print(f"{user_id} not in {group_users}")
+        if user_id not in group_members:
+            print(f"{user_id} not in {group_members}")
             return False
     return True
-
-def response(err_code :int, body :dict):
-    return {
-        'statusCode': err_code,
-        'headers': {'Content-Type': 'application/json'},
-        'body': json.dumps(body)
-    }
\ No newline at end of file
@@ -1,8 +1,9 @@
 import os
-import json
 import uuid
 import datetime
 import boto3
+from schema import field, compile_schema, parse_body
+from serializer import dumps, response
 
 ddb = boto3.resource('dynamodb')
 user_table_name = os.environ.get('USER_TABLE')
@@ -12,9 +13,14 @@ try:
 except Exception as e:
     print(f"error initializing table connection {user_table_name} - {e}")
 
+NEW_USER = compile_schema({
+    'name': field(str),
+    'email': field(str)
+})
+
 
 def lambda_handler(event :dict, context):
-    print(f"incoming event - {json.dumps(event)}")
+    print(f"incoming event - {dumps(event)}")
     http_method = event.get('httpMethod')
 
     if http_method == 'POST':
@@ -26,15 +32,9 @@ def lambda_handler(event :dict, context):
 
 
 def add_new_user(event):
-    try:
-        request_body = json.loads(event.get('body'))
-    except Exception as e:
-        print(f"Error request body not valid json - {event.get('body')} | {e}")
-        return response(400, {'error': 'invalid parameters'})
-
-    # validate request params
-    if 'name' not in request_body or 'email' not in request_body:
-        return response(400, {'error': 'invalid parameters'})
+    request_body, error = parse_body(event, NEW_USER)
+    if error is not None:
+        return response(400, {'error': 'invalid parameters', 'details': error})
 
     user_id = uuid.uuid4().hex[:8]
     timestamp = datetime.datetime.now().isoformat()
@@ -44,7 +44,6 @@ def add_new_user(event):
             Item={
                 'user_id': user_id,
                 'join_date': timestamp,
-                'groups': [],
                 'name': request_body['name'],
                 'email': request_body['email']
             }    
@@ -78,13 +77,5 @@ def ret_user_details(event):
         'status': 'success',
         'name': ret['Item']['name'],
         'email': ret['Item']['email'],
-        'groups': ret['Item']['groups']
+        'groups': sorted(ret['Item'].get('groups', ()))
     })
-
-
-def response(err_code :int, body :dict):
-    return {
-        'statusCode': err_code,
-        'headers': {'Content-Type': 'application/json'},
-        'body': json.dumps(body)
-    }
\ No newline at end of file
@@ -40,12 +40,38 @@ class InfraStack(cdk.Stack):
             )
         )
 
+        settlements_table = ddb.Table(
+            self, "settlements",
+            table_name="splitwise_settlements",
+            partition_key=ddb.Attribute(
+                name='group_id', 
+                type=ddb.AttributeType.STRING
+            ),
+            sort_key=ddb.Attribute(
+                name='settle_id', 
+                type=ddb.AttributeType.STRING
+            )
+        )
+
+        # Handler code shared by every lambda, bundled once with the packages from requirements-lambda.txt
+        backend_code = lambda_.Code.from_asset(
+            '../backend',
+            exclude=['tests', '__pycache__', 'requirements-dev.txt'],
+            bundling=cdk.BundlingOptions(
+                image=lambda_.Runtime.PYTHON_3_8.bundling_image,
+                command=[
+                    'bash', '-c',
+                    'pip install -r requirements-lambda.txt -t /asset-output && cp -au . /asset-output'
+                ]
+            )
+        )
+
         # Create Lambda handlers
         create_user_lambda = lambda_.Function(
             self, "create_user_func",
             function_name= "splitwise_create_user_func",
             runtime=lambda_.Runtime.PYTHON_3_8,
-            code=lambda_.Code.from_asset('../backend'),
+            code=backend_code,
             handler="user_mgr.lambda_handler",
             environment={
                 'USER_TABLE': user_table.table_name
@@ -56,7 +82,7 @@ class InfraStack(cdk.Stack):
             self, "create_group_func",
             function_name= "splitwise_create_group_func",
             runtime=lambda_.Runtime.PYTHON_3_8,
-            code=lambda_.Code.from_asset('../backend'),
+            code=backend_code,
             handler="group_mgr.lambda_handler",
             environment={
                 'USER_TABLE': user_table.table_name,
@@ -69,7 +95,7 @@ class InfraStack(cdk.Stack):
             self, "transactions_func",
             function_name= "splitwise_transactions_func",
             runtime=lambda_.Runtime.PYTHON_3_8,
-            code=lambda_.Code.from_asset('../backend'),
+            code=backend_code,
             handler="transaction_mgr.lambda_handler",
             environment={
                 'USER_TABLE': user_table.table_name,
@@ -82,7 +108,7 @@ class InfraStack(cdk.Stack):
             self, "summary_func",
             function_name= "splitwise_summary_func",
             runtime=lambda_.Runtime.PYTHON_3_8,
-            code=lambda_.Code.from_asset('../backend'),
+            code=backend_code,
             handler="summary_mgr.lambda_handler",
             environment={
                 'USER_TABLE': user_table.table_name,
@@ -91,33 +117,34 @@ class InfraStack(cdk.Stack):
             }
         )
 
-        # settlements_lambda = lambda_.Function(
-        #     self, "settlements_func",
-        #     runtime=lambda_.Runtime.PYTHON_3_8,
-        #     code=lambda_.Code.from_asset('../backend'),
-        #     handler="settlements_mgr.lambda_handler",
-        #     environment={
-        #         'USER_TABLE': user_table.table_name,
-        #         'GROUP_TABLE': groups_table.table_name,
-        #         'TRANS_TABLE': transactions_table.table_name
-        #     }
-        # )
+        settlements_lambda = lambda_.Function(
+            self, "settlements_func",
+            function_name= "splitwise_settlements_func",
+            runtime=lambda_.Runtime.PYTHON_3_8,
+            code=backend_code,
+            handler="settlements_mgr.lambda_handler",
+            environment={
+                'GROUP_TABLE': groups_table.table_name,
+                'SETTLE_TABLE': settlements_table.table_name
+            }
+        )
 
         # Grant permissions
         user_table.grant_read_write_data(create_user_lambda)
         user_table.grant_read_write_data(create_group_lambda)
         user_table.grant_read_data(transactions_lambda)
         user_table.grant_read_data(summary_lambda)
-        # user_table.grant_read_data(settlements_lambda)
 
         transactions_table.grant_read_data(create_group_lambda)
         transactions_table.grant_read_write_data(transactions_lambda)
         transactions_table.grant_read_data(summary_lambda)
-        # transactions_table.grant_read_data(settlements_lambda)
 
         groups_table.grant_read_write_data(create_group_lambda)
         groups_table.grant_read_write_data(transactions_lambda)
         groups_table.grant_read_data(summary_lambda)
+        groups_table.grant_read_write_data(settlements_lambda)
+
+        settlements_table.grant_read_write_data(settlements_lambda)
 
 
 
@@ -129,6 +156,7 @@ class InfraStack(cdk.Stack):
         create_group_integration = apigateway.LambdaIntegration(create_group_lambda)
         transactions_integration = apigateway.LambdaIntegration(transactions_lambda)
         summary_integration = apigateway.LambdaIntegration(summary_lambda)
+        settlements_integration = apigateway.LambdaIntegration(settlements_lambda)
 
         # endpoints and http methods
         users_endpoint = api.root.add_resource('users')
@@ -137,7 +165,11 @@ class InfraStack(cdk.Stack):
 
         groups_endpoint = api.root.add_resource('groups')
         groups_endpoint.add_method('POST', create_group_integration)
-        groups_endpoint.add_resource('{group_id}').add_method('GET', create_group_integration)
+        group_endpoint = groups_endpoint.add_resource('{group_id}')
+        group_endpoint.add_method('GET', create_group_integration)
+        members_endpoint = group_endpoint.add_resource('members')
+        members_endpoint.add_method('POST', create_group_integration)
+        members_endpoint.add_resource('{user_id}').add_method('DELETE', create_group_integration)
 
         transactions_endpoint = api.root.add_resource('transactions')
         transactions_endpoint.add_method('POST', transactions_integration)
@@ -145,6 +177,12 @@ class InfraStack(cdk.Stack):
         summary_endpoint = api.root.add_resource('summary')
         summary_endpoint.add_resource('{group_id}').add_method('GET', summary_integration)
 
+        settlements_endpoint = api.root.add_resource('settlements')
+        settlements_endpoint.add_method('POST', settlements_integration)
+        group_settlements_endpoint = settlements_endpoint.add_resource('{group_id}')
+        group_settlements_endpoint.add_method('GET', settlements_integration)
+        group_settlements_endpoint.add_resource('{settle_id}').add_method('GET', settlements_integration)
+
         api.root.add_method("ANY", 
             apigateway.MockIntegration(
                 integration_responses=[
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Load generator for the splitwise api.
+
+Drives a weighted mix of create-user, create-group, add-transaction and summary
+calls against a deployed stage or tools/local_server.py. Requests are sent open
+loop - arrivals follow a poisson process at the requested rate whether or not
+earlier requests have completed - and latency is measured from the scheduled
+send time, so a saturated target shows up as growing latency instead of a
+silently lower request rate. Groups are picked with zipfian popularity to model
+a few hot groups taking most of the traffic.
+
+    python tools/load_test.py --target http://localhost:3000 --rate 50 --duration 60 \\
+        --output run2.json --compare run1.json
+"""
+import sys
+import json
+import time
+import math
+import random
+import bisect
+import argparse
+import datetime
+import threading
+import http.client
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+ENDPOINTS = ('create_user', 'create_group', 'add_transaction', 'summary')
+DEFAULT_MIX = 'create_user=1,create_group=1,add_transaction=6,summary=2'
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram:
+    """
+    HDR style histogram of latencies in microseconds.
+    values are bucketed by their top `precision_bits` significant bits, which keeps
+    the relative error of every recorded value below 2^-(precision_bits - 1)
+    whatever its magnitude, with a small fixed number of buckets per power of two.
+    """
+
+    def __init__(self, precision_bits=7):
+        self.precision_bits = precision_bits
+        self.counts = defaultdict(int)
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+
+    def _shift(self, value):
+        return max(0, value.bit_length() - self.precision_bits)
+
+    def _bucket(self, value):
+        shift = self._shift(value)
+        return (value >> shift) << shift
+
+    def _bucket_max(self, bucket):
+        # highest value that lands in the bucket, percentiles never under-report the tail
+        return min(bucket + (1 << self._shift(bucket)) - 1, self.max)
+
+    def record(self, value_us):
+        value_us = max(1, int(value_us))
+        self.counts[self._bucket(value_us)] += 1
+        self.total += 1
+        self.sum += value_us
+        self.max = max(self.max, value_us)
+
+    def percentile(self, pct):
+        if self.total == 0:
+            return 0
+        target = math.ceil(self.total * pct / 100)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= target:
+                return self._bucket_max(bucket)
+        return self.max
+
+    def mean(self):
+        return self.sum / self.total if self.total else 0
+
+    def to_dict(self):
+        return {
+            'precision_bits': self.precision_bits,
+            'total': self.total,
+            'sum': self.sum,
+            'max': self.max,
+            'counts': [[bucket, self.counts[bucket]] for bucket in sorted(self.counts)]
+        }
+
+
+class ZipfSampler:
+    """ picks indexes 0..n-1 with probability proportional to 1/(rank+1)^s """
+
+    def __init__(self, n, s, rng):
+        self.rng = rng
+        self.cumulative = []
+        total = 0
+        for rank in range(1, n + 1):
+            total += 1 / rank ** s
+            self.cumulative.append(total)
+
+    def sample(self):
+        return bisect.bisect_left(self.cumulative, self.rng.random() * self.cumulative[-1])
+
+
+class ApiClient:
+    """ thin http client, keeps one persistent connection per calling thread """
+
+    def __init__(self, target, timeout):
+        url = urlsplit(target)
+        self.conn_cls = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = url.netloc
+        self.prefix = url.path.rstrip('/')
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def request(self, method, path, body=None):
+        """ returns (status, parsed json body or None), status 0 means a connection error """
+        payload = json.dumps(body) if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload else {}
+        for attempt in range(2):
+            conn = getattr(self.local, 'conn', None)
+            if conn is None:
+                conn = self.local.conn = self.conn_cls(self.netloc, timeout=self.timeout)
+            try:
+                conn.request(method, self.prefix + path, body=payload, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                self.local.conn = None
+                # a stale keep-alive connection fails once, retry on a fresh one
+                if attempt == 0 and isinstance(e, (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)):
+                    continue
+                return 0, None
+            try:
+                return resp.status, json.loads(data) if data else None
+            except ValueError:
+                return resp.status, None
+        return 0, None
+
+
+class Workload:
+    """ the set of users and groups the traffic mix operates on """
+
+    def __init__(self, client, rng, zipf_s, group_size):
+        self.client = client
+        self.rng = rng
+        self.zipf_s = zipf_s
+        self.group_size = group_size
+        self.users = []
+        self.groups = []
+        self.group_sampler = None
+        self.lock = threading.Lock()
+        self.seq = 0
+
+    def _next_seq(self):
+        with self.lock:
+            self.seq += 1
+            return self.seq
+
+    def _random_members(self, size):
+        with self.lock:
+            return self.rng.sample(self.users, min(size, len(self.users)))
+
+    def _hot_group(self):
+        with self.lock:
+            return self.groups[self.group_sampler.sample()]
+
+    def setup(self, num_users, num_groups):
+        for _ in range(num_users):
+            status, body = self.create_user()
+            if status != 200:
+                raise RuntimeError(f"unable to create user during setup - {status} {body}")
+        for _ in range(num_groups):
+            status, body = self.create_group()
+            if status != 200:
+                raise RuntimeError(f"unable to create group during setup - {status} {body}")
+        # rank order is the creation order, groups created during the run are not sampled
+        self.group_sampler = ZipfSampler(len(self.groups), self.zipf_s, self.rng)
+
+    def create_user(self):
+        seq = self._next_seq()
+        status, body = self.client.request('POST', '/users', {'name': f'load_user_{seq}', 'email': f'load_{seq}@example.com'})
+        if status == 200:
+            with self.lock:
+                self.users.append(body['user_id'])
+        return status, body
+
+    def create_group(self):
+        members = self._random_members(self.group_size)
+        status, body = self.client.request('POST', '/groups', {'name': f'load_group_{self._next_seq()}', 'members': members})
+        if status == 200:
+            with self.lock:
+                self.groups.append((body['group_id'], members))
+        return status, body
+
+    def add_transaction(self):
+        group_id, members = self._hot_group()
+        with self.lock:
+            participants = self.rng.sample(members, self.rng.randint(min(2, len(members)), len(members)))
+            payer = self.rng.choice(participants)
+            amount = self.rng.randint(1, 500) * len(participants)
+        return self.client.request('POST', '/transactions', {
+            'name': f'load_trans_{self._next_seq()}',
+            'total_amount': amount,
+            'group_id': group_id,
+            'participants': participants,
+            'payers': {payer: amount}
+        })
+
+    def summary(self):
+        group_id, _ = self._hot_group()
+        return self.client.request('GET', f'/summary/{group_id}')
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"unknown endpoint '{name}' in mix, expected one of {', '.join(ENDPOINTS)}")
+        weights[name] = float(weight)
+    return weights
+
+
+def run(workload, weights, rate, duration, max_in_flight, rng):
+    names = list(weights)
+    cum_weights = []
+    total = 0
+    for name in names:
+        total += weights[name]
+        cum_weights.append(total)
+
+    histograms = {name: LatencyHistogram() for name in names}
+    statuses = {name: defaultdict(int) for name in names}
+    lock = threading.Lock()
+    dropped = 0
+
+    def call(name, scheduled):
+        status, _ = getattr(workload, name)()
+        latency_us = (time.perf_counter() - scheduled) * 1e6
+        with lock:
+            histograms[name].record(latency_us)
+            statuses[name][status] += 1
+
+    in_flight = threading.BoundedSemaphore(max_in_flight)
+
+    def release(_):
+        in_flight.release()
+
+    start = time.perf_counter()
+    next_at = start
+    end = start + duration
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        while True:
+            next_at += rng.expovariate(rate)
+            if next_at >= end:
+                break
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if not in_flight.acquire(blocking=False):
+                # generator itself is saturated, count it instead of silently slowing down
+                dropped += 1
+                continue
+            name = names[bisect.bisect_left(cum_weights, rng.random() * total)]
+            pool.submit(call, name, next_at).add_done_callback(release)
+    elapsed = time.perf_counter() - start
+    return histograms, statuses, dropped, elapsed
+
+
+def summarize(histograms, statuses, elapsed):
+    endpoints = {}
+    for name, hist in histograms.items():
+        codes = statuses[name]
+        endpoints[name] = {
+            'count': hist.total,
+            'errors': sum(count for code, count in codes.items() if code != 200),
+            'statuses': {str(code): count for code, count in sorted(codes.items())},
+            'throughput_rps': round(hist.total / elapsed, 2) if elapsed else 0,
+            'mean_ms': round(hist.mean() / 1000, 3),
+            'max_ms': round(hist.max / 1000, 3),
+            'percentiles_ms': {str(p): round(hist.percentile(p) / 1000, 3) for p in PERCENTILES},
+            'histogram': hist.to_dict()
+        }
+    return endpoints
+
+
+def print_report(results, previous=None):
+    header = f"{'endpoint':<16}{'count':>8}{'errors':>8}{'rps':>9}" + ''.join(f"{'p' + str(p):>10}" for p in PERCENTILES)
+    print(header)
+    for name, stats in results['endpoints'].items():
+        row = f"{name:<16}{stats['count']:>8}{stats['errors']:>8}{stats['throughput_rps']:>9}"
+        row += ''.join(f"{stats['percentiles_ms'][str(p)]:>10}" for p in PERCENTILES)
+        print(row)
+        prev = (previous or {}).get('endpoints', {}).get(name)
+        if prev:
+            deltas = f"{'':<16}{'':>8}{stats['errors'] - prev['errors']:>+8}{stats['throughput_rps'] - prev['throughput_rps']:>+9.2f}"
+            for p in PERCENTILES:
+                old = prev['percentiles_ms'][str(p)]
+                new = stats['percentiles_ms'][str(p)]
+                deltas += f"{(new - old) / old * 100 if old else 0:>+9.1f}%"
+            print(deltas)
+    print(f"latencies in ms, scheduled rate {results['config']['rate']} rps, "
+          f"achieved {results['achieved_rps']} rps, dropped {results['dropped']}")
+    if previous:
+        print(f"deltas vs run at {previous['started']} (rps absolute, percentiles relative)")
+
+
+def load_results(path):
+    """ results json of an earlier run, ValueError if it is not one """
+    with open(path) as f:
+        previous = json.load(f)
+    if not isinstance(previous, dict) or 'started' not in previous or not isinstance(previous.get('endpoints'), dict):
+        raise ValueError(f"{path} is not a load_test.py results file")
+    for name, stats in previous['endpoints'].items():
+        missing = [key for key in ('errors', 'throughput_rps', 'percentiles_ms') if key not in stats]
+        if missing:
+            raise ValueError(f"{path} endpoint {name} is missing {', '.join(missing)}")
+    return previous
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='open loop load generator for the splitwise api')
+    parser.add_argument('--target', required=True, help='base url, e.g. http://localhost:3000 or https://<api>/prod')
+    parser.add_argument('--rate', type=float, default=20, help='scheduled requests per second')
+    parser.add_argument('--duration', type=float, default=30, help='run length in seconds')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'endpoint weights (default {DEFAULT_MIX})')
+    parser.add_argument('--users', type=int, default=50, help='users created before the run')
+    parser.add_argument('--groups', type=int, default=20, help='groups created before the run')
+    parser.add_argument('--group-size', type=int, default=5)
+    parser.add_argument('--zipf', type=float, default=1.1, help='zipf exponent for group popularity, 0 is uniform')
+    parser.add_argument('--max-in-flight', type=int, default=64, help='max concurrent requests')
+    parser.add_argument('--timeout', type=float, default=30, help='per request timeout in seconds')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', help='write results json to this file')
+    parser.add_argument('--compare', help='results json of a previous run to compare against')
+    args = parser.parse_args(argv)
+
+    try:
+        weights = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.users < 2 or args.groups < 1:
+        parser.error('need at least 2 users and 1 group')
+    # read the baseline up front, a bad path should not cost a whole run
+    previous = None
+    if args.compare:
+        try:
+            previous = load_results(args.compare)
+        except (OSError, ValueError) as e:
+            parser.error(f"--compare {e}")
+
+    # the scheduler and the workers draw from separate generators, both seeded for repeatable runs
+    workload_rng = random.Random(None if args.seed is None else args.seed + 1)
+    workload = Workload(ApiClient(args.target, args.timeout), workload_rng, args.zipf, args.group_size)
+    print(f"creating {args.users} users and {args.groups} groups on {args.target}")
+    workload.setup(args.users, args.groups)
+
+    print(f"running {args.duration}s at {args.rate} rps")
+    started = datetime.datetime.now().isoformat()
+    histograms, statuses, dropped, elapsed = run(workload, weights, args.rate, args.duration, args.max_in_flight, random.Random(args.seed))
+
+    results = {
+        'started': started,
+        'config': vars(args),
+        'elapsed_sec': round(elapsed, 3),
+        'achieved_rps': round(sum(h.total for h in histograms.values()) / elapsed, 2),
+        'dropped': dropped,
+        'endpoints': summarize(histograms, statuses, elapsed)
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.output}")
+
+    print_report(results, previous)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Local HTTP server that runs the backend lambda handlers without API Gateway.
+
+Routes mirror the API Gateway resources defined in infra/infra/infra_stack.py and
+every request is turned into an API Gateway proxy event before being handed to the
+matching `lambda_handler`. Invocations run on a fixed pool of worker threads; each
+worker behaves like a warm lambda container - handler modules are imported (cold
+start) the first time a worker sees a function and reused for later requests.
+
+Storage is expected to be DynamoDB Local (or any DynamoDB compatible endpoint):
+    docker run -p 8000:8000 amazon/dynamodb-local
+    python tools/local_server.py --ddb-endpoint http://localhost:8000 --create-tables
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import datetime
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qsl
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+# same names and keys (partition, sort) as the tables created in infra_stack.py
+TABLES = {
+    'USER_TABLE': ('splitwise_registered_users', 'user_id', None),
+    'GROUP_TABLE': ('splitwise_user_groups', 'group_id', None),
+    'TRANS_TABLE': ('splitwise_transactions', 'trans_id', None),
+    'SETTLE_TABLE': ('splitwise_settlements', 'group_id', 'settle_id'),
+}
+
+# (http method, api gateway resource, lambda function name, handler module)
+ROUTES = [
+    ('POST', '/users', 'splitwise_create_user_func', 'user_mgr'),
+    ('GET', '/users/{user_id}', 'splitwise_create_user_func', 'user_mgr'),
+    ('POST', '/groups', 'splitwise_create_group_func', 'group_mgr'),
+    ('GET', '/groups/{group_id}', 'splitwise_create_group_func', 'group_mgr'),
+    ('POST', '/groups/{group_id}/members', 'splitwise_create_group_func', 'group_mgr'),
+    ('DELETE', '/groups/{group_id}/members/{user_id}', 'splitwise_create_group_func', 'group_mgr'),
+    ('POST', '/transactions', 'splitwise_transactions_func', 'transaction_mgr'),
+    ('GET', '/summary/{group_id}', 'splitwise_summary_func', 'summary_mgr'),
+    ('POST', '/settlements', 'splitwise_settlements_func', 'settlements_mgr'),
+    ('GET', '/settlements/{group_id}', 'splitwise_settlements_func', 'settlements_mgr'),
+    ('GET', '/settlements/{group_id}/{settle_id}', 'splitwise_settlements_func', 'settlements_mgr'),
+]
+
+# thread local "container" - handler modules loaded by the current worker thread
+_container = threading.local()
+
+# handler modules create their boto3 resources on the shared default session at import,
+# which is not thread safe, so simultaneous cold starts are run one at a time
+_cold_start_lock = threading.Lock()
+
+
+def match_route(method, path):
+    """ returns (route, path_params) for the request, route is None if nothing matches """
+    parts = [p for p in path.split('/') if p]
+    for route in ROUTES:
+        template = [p for p in route[1].split('/') if p]
+        if route[0] != method or len(template) != len(parts):
+            continue
+        path_params = {}
+        for tmpl, part in zip(template, parts):
+            if tmpl.startswith('{') and tmpl.endswith('}'):
+                path_params[tmpl[1:-1]] = part
+            elif tmpl != part:
+                break
+        else:
+            return route, path_params
+    return None, {}
+
+
+def build_event(method, resource, path, path_params, query, headers, body):
+    """ builds an API Gateway (REST api) lambda proxy integration event """
+    now = datetime.datetime.utcnow()
+    return {
+        'resource': resource,
+        'path': path,
+        'httpMethod': method,
+        'headers': headers or None,
+        'multiValueHeaders': {k: [v] for k, v in headers.items()} or None,
+        'queryStringParameters': dict(query) or None,
+        'multiValueQueryStringParameters': {k: [v for qk, v in query if qk == k] for k, _ in query} or None,
+        'pathParameters': path_params or None,
+        'stageVariables': None,
+        'requestContext': {
+            'resourcePath': resource,
+            'httpMethod': method,
+            'path': '/local' + path,
+            'stage': 'local',
+            'requestId': str(uuid.uuid4()),
+            'requestTime': now.strftime('%d/%b/%Y:%H:%M:%S +0000'),
+            'requestTimeEpoch': int(now.timestamp() * 1000),
+            'identity': {'sourceIp': '127.0.0.1', 'userAgent': headers.get('User-Agent')},
+        },
+        'body': body,
+        'isBase64Encoded': False,
+    }
+
+
+class LambdaContext:
+    """ minimal stand-in for the context object passed by the lambda runtime """
+
+    def __init__(self, function_name, timeout_sec=3, memory_mb=128):
+        self.function_name = function_name
+        self.function_version = '$LATEST'
+        self.invoked_function_arn = f'arn:aws:lambda:local:000000000000:function:{function_name}'
+        self.memory_limit_in_mb = memory_mb
+        self.aws_request_id = str(uuid.uuid4())
+        self.log_group_name = f'/aws/lambda/{function_name}'
+        self.log_stream_name = 'local'
+        self._deadline = time.monotonic() + timeout_sec
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+
+def load_handler(module_name):
+    """
+    returns the lambda_handler of `module_name` for the current worker.
+    every worker imports its own copy of the module, so module level state
+    (boto3 clients, caches) is reused across requests like a warm container
+    but never shared between concurrently running requests.
+    """
+    modules = getattr(_container, 'modules', None)
+    if modules is None:
+        modules = _container.modules = {}
+    if module_name in modules:
+        return modules[module_name]
+
+    start = time.perf_counter()
+    spec = importlib.util.spec_from_file_location(
+        f'{module_name}__{threading.get_ident()}',
+        os.path.join(BACKEND_DIR, f'{module_name}.py')
+    )
+    module = importlib.util.module_from_spec(spec)
+    with _cold_start_lock:
+        spec.loader.exec_module(module)
+    modules[module_name] = module.lambda_handler
+    init_ms = (time.perf_counter() - start) * 1000
+    print(f"cold start - {module_name} on {threading.current_thread().name} ({init_ms:.1f} ms)")
+    return module.lambda_handler
+
+
+def invoke(route, event, timeout_sec):
+    handler = load_handler(route[3])
+    context = LambdaContext(route[2], timeout_sec)
+    try:
+        return handler(event, context)
+    except Exception as e:
+        print(f"Unhandled error in {route[2]} | {e}")
+        return {'statusCode': 502, 'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({'message': 'Internal server error'})}
+
+
+class LambdaRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _dispatch(self):
+        # always drain the body, the connection is kept alive for the next request
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else None
+
+        url = urlsplit(self.path)
+        route, path_params = match_route(self.command, url.path)
+        if route is None:
+            # what API Gateway returns for unknown resources and methods
+            return self._send(403, {'Content-Type': 'application/json'},
+                              json.dumps({'message': 'Missing Authentication Token'}))
+
+        event = build_event(self.command, route[1], url.path, path_params,
+                            parse_qsl(url.query), dict(self.headers), body)
+
+        ret = self.server.pool.submit(invoke, route, event, self.server.lambda_timeout).result()
+        self._send(ret.get('statusCode', 200), ret.get('headers') or {}, ret.get('body') or '')
+
+    def _send(self, status, headers, body):
+        payload = body.encode('utf-8') if isinstance(body, str) else body
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = _dispatch
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class PooledHTTPServer(ThreadingHTTPServer):
+    """
+    HTTPServer that accepts any number of connections (like API Gateway) but runs
+    the lambda invocations on a fixed size pool of worker threads (the containers)
+    """
+    daemon_threads = True
+
+    def __init__(self, address, handler_cls, workers, lambda_timeout, quiet):
+        super().__init__(address, handler_cls)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='container')
+        self.lambda_timeout = lambda_timeout
+        self.quiet = quiet
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def configure_storage(endpoint, region):
+    """ points boto3 at a local DynamoDB and sets the table env vars read by the handlers """
+    for env_name, (table_name, _, _) in TABLES.items():
+        os.environ.setdefault(env_name, table_name)
+    os.environ.setdefault('AWS_DEFAULT_REGION', region)
+    if endpoint:
+        os.environ['AWS_ENDPOINT_URL_DYNAMODB'] = endpoint
+        # DynamoDB Local accepts any credentials
+        os.environ.setdefault('AWS_ACCESS_KEY_ID', 'local')
+        os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'local')
+
+
+def create_tables():
+    import boto3
+    ddb = boto3.resource('dynamodb')
+    existing = {t.name for t in ddb.tables.all()}
+    for env_name, (_, key, sort_key) in TABLES.items():
+        table_name = os.environ[env_name]
+        if table_name in existing:
+            continue
+        key_schema = [{'AttributeName': key, 'KeyType': 'HASH'}]
+        if sort_key:
+            key_schema.append({'AttributeName': sort_key, 'KeyType': 'RANGE'})
+        ddb.create_table(
+            TableName=table_name,
+            KeySchema=key_schema,
+            AttributeDefinitions=[{'AttributeName': k['AttributeName'], 'AttributeType': 'S'} for k in key_schema],
+            BillingMode='PAY_PER_REQUEST'
+        ).wait_until_exists()
+        print(f"created table {table_name}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='run the splitwise lambda handlers behind a local http server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--workers', type=int, default=8,
+                        help='size of the worker pool, i.e. number of concurrently warm containers')
+    parser.add_argument('--timeout', type=float, default=3,
+                        help='lambda timeout in seconds reported through the context object')
+    parser.add_argument('--ddb-endpoint', default=None,
+                        help='DynamoDB endpoint to use instead of AWS, e.g. http://localhost:8000')
+    parser.add_argument('--region', default='ap-south-1')
+    parser.add_argument('--create-tables', action='store_true', help='create missing tables before starting')
+    parser.add_argument('--quiet', action='store_true', help='disable per request access logs')
+    args = parser.parse_args(argv)
+
+    configure_storage(args.ddb_endpoint, args.region)
+    sys.path.insert(0, BACKEND_DIR)
+    if args.create_tables:
+        create_tables()
+
+    server = PooledHTTPServer((args.host, args.port), LambdaRequestHandler,
+                              args.workers, args.timeout, args.quiet)
+    print(f"serving on http://{args.host}:{args.port} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+One-off migration of group membership to string sets.
+
+Users and groups created before membership was stored as string sets keep
+`groups` / `members` as lists. The handlers convert such an item the first time
+they add or remove a membership on it (see backend/membership_sets.py); this
+converts every list valued attribute up front instead, so those first writes
+skip the extra round trips. Empty lists are removed, DynamoDB has no empty sets.
+Safe to re-run, items already migrated are skipped.
+
+    python tools/migrate_membership_sets.py --dry-run
+    python tools/migrate_membership_sets.py
+"""
+import os
+import sys
+import argparse
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+from membership_sets import list_to_set
+
+# (table, partition key, membership attribute)
+MIGRATIONS = [
+    (os.environ.get('USER_TABLE', 'splitwise_registered_users'), 'user_id', 'groups'),
+    (os.environ.get('GROUP_TABLE', 'splitwise_user_groups'), 'group_id', 'members'),
+]
+
+
+def migrate_item(table, key, attr, item, dry_run):
+    """ returns True if the item was (or would be) converted """
+    values = item.get(attr)
+    if not isinstance(values, list):
+        return False
+    if dry_run:
+        return True
+    return list_to_set(table, {key: item[key]}, attr, values)
+
+
+def migrate_table(ddb, table_name, key, attr, dry_run):
+    table = ddb.Table(table_name)
+    scan_kwargs = {
+        'ProjectionExpression': '#k, #a',
+        'ExpressionAttributeNames': {'#k': key, '#a': attr},
+    }
+    scanned = converted = 0
+    while True:
+        ret = table.scan(**scan_kwargs)
+        for item in ret.get('Items', []):
+            scanned += 1
+            converted += migrate_item(table, key, attr, item, dry_run)
+        if 'LastEvaluatedKey' not in ret:
+            break
+        scan_kwargs['ExclusiveStartKey'] = ret['LastEvaluatedKey']
+    return scanned, converted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='convert list valued groups / members attributes to string sets')
+    parser.add_argument('--dry-run', action='store_true', help='only count the items that need converting')
+    args = parser.parse_args(argv)
+
+    import boto3
+    ddb = boto3.resource('dynamodb')
+    for table_name, key, attr in MIGRATIONS:
+        scanned, converted = migrate_table(ddb, table_name, key, attr, args.dry_run)
+        action = 'to convert' if args.dry_run else 'converted'
+        print(f"{table_name}: {scanned} items scanned, {converted} {action} ({attr})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
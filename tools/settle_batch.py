@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Offline settlement batch job for every group.
+
+Reads the whole transactions and settlements tables with parallel segmented
+Scans, folds each record's payables into running per group totals as pages
+arrive (individual records are never held in memory), then computes the consolidated
+settlements of every group on a process pool using the same algorithm as
+GET /summary. Groups are handed to the pool in chunks with only a few chunks in
+flight per worker, and results are written as chunks finish. Output is one json
+line per group -
+    {"group_id": "e2e44673", "payments": [["<debitor>", "<creditor>", "200.00"], ...]}
+
+Scan progress is saved to a checkpoint file every --checkpoint-every seconds and
+at the end of the scan, and the output file doubles as the checkpoint while
+settling, so re-running the same command resumes an interrupted run.
+
+    python tools/settle_batch.py --output settlements.jsonl --segments 16 --workers 8
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from itertools import islice
+from collections import deque
+from decimal import Decimal
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+from settlement_calc import consolidate_payables
+
+
+class ScanState:
+    """ running per group totals plus the resume position of every scan segment of every table """
+
+    def __init__(self, tables, total_segments):
+        self.tables = tables
+        self.total_segments = total_segments
+        self.totals = defaultdict(lambda: defaultdict(Decimal))
+        self.segments = {f"{table}/{seg}": {'last_key': None, 'done': False}
+                         for table in tables for seg in range(total_segments)}
+        self.items = 0
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+
+    def merge_page(self, segment, page_totals, page_items, last_key):
+        # page totals and the segment position move together, so a checkpoint never counts a page twice
+        with self.lock:
+            for group_id, amounts in page_totals.items():
+                group_totals = self.totals[group_id]
+                for user_id, amount in amounts.items():
+                    group_totals[user_id] += amount
+            self.items += page_items
+            self.segments[segment]['last_key'] = last_key
+            self.segments[segment]['done'] = last_key is None
+
+    def save(self, path):
+        # snapshot under the merge lock, write outside it so scanning is only paused for the copy
+        with self.save_lock:
+            with self.lock:
+                data = {
+                    'tables': self.tables,
+                    'total_segments': self.total_segments,
+                    'items': self.items,
+                    'segments': {seg: dict(state) for seg, state in self.segments.items()},
+                    'totals': {group_id: {user_id: str(amount) for user_id, amount in amounts.items()}
+                               for group_id, amounts in self.totals.items()}
+                }
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, tables, total_segments):
+        with open(path) as f:
+            data = json.load(f)
+        if data['tables'] != tables or data['total_segments'] != total_segments:
+            raise ValueError(f"checkpoint {path} was written for tables {data['tables']} with "
+                             f"{data['total_segments']} segments, resume with the same options")
+        state = cls(tables, total_segments)
+        state.items = data['items']
+        state.segments = data['segments']
+        for group_id, amounts in data['totals'].items():
+            for user_id, amount in amounts.items():
+                state.totals[group_id][user_id] = Decimal(amount)
+        return state
+
+
+def scan_segment(table_name, segment, state, checkpoint, checkpoint_every, stop):
+    import boto3
+    # boto3 resources are not thread safe, every segment gets its own session
+    table = boto3.session.Session().resource('dynamodb').Table(table_name)
+    scan_kwargs = {
+        'Segment': segment,
+        'TotalSegments': state.total_segments,
+        'ProjectionExpression': '#g, payables',
+        'ExpressionAttributeNames': {'#g': 'group_id'},
+    }
+    segment_key = f"{table_name}/{segment}"
+    last_key = state.segments[segment_key]['last_key']
+    last_saved = time.monotonic()
+    # stop is set when another segment failed, the page just read is still merged
+    while not state.segments[segment_key]['done'] and not stop.is_set():
+        if last_key is not None:
+            scan_kwargs['ExclusiveStartKey'] = last_key
+        ret = table.scan(**scan_kwargs)
+
+        page_totals = defaultdict(lambda: defaultdict(Decimal))
+        for item in ret.get('Items', []):
+            if 'group_id' not in item or 'payables' not in item:
+                continue
+            group_totals = page_totals[item['group_id']]
+            for user_id, amount in item['payables'].items():
+                group_totals[user_id] += amount
+
+        last_key = ret.get('LastEvaluatedKey')
+        state.merge_page(segment_key, page_totals, len(ret.get('Items', [])), last_key)
+
+        if checkpoint and time.monotonic() - last_saved >= checkpoint_every:
+            state.save(checkpoint)
+            last_saved = time.monotonic()
+
+
+def scan_tables(state, checkpoint, checkpoint_every):
+    pending = [(table, seg) for table in state.tables for seg in range(state.total_segments)
+               if not state.segments[f"{table}/{seg}"]['done']]
+    if not pending:
+        return
+    print(f"scanning {', '.join(state.tables)} - {len(pending)} of {len(state.segments)} segments remaining")
+    stop = threading.Event()
+    try:
+        with ThreadPoolExecutor(max_workers=len(pending)) as pool:
+            futures = [pool.submit(scan_segment, table, seg, state, checkpoint, checkpoint_every, stop)
+                       for table, seg in pending]
+            try:
+                for future in futures:
+                    future.result()
+            finally:
+                # on an error the other segments finish their current page instead of their whole scan
+                stop.set()
+    finally:
+        if checkpoint:
+            state.save(checkpoint)
+
+
+def settle_group(args):
+    group_id, amounts = args
+    consolidated = consolidate_payables(dict(amounts))
+    if consolidated is None:
+        return {'group_id': group_id, 'error': 'transaction amounts do not add up to zero',
+                'total': str(sum(amounts.values()))}
+    payments = []
+    for creditor in consolidated:
+        for debitor, amount in consolidated[creditor].items():
+            if amount > 0:
+                payments.append([debitor, creditor, str(amount)])
+    return {'group_id': group_id, 'payments': payments}
+
+
+def settle_chunk(chunk):
+    return [settle_group(args) for args in chunk]
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def completed_groups(output):
+    """ group ids already written to the output file, drops a partially written last line """
+    done = set()
+    if not os.path.exists(output):
+        return done
+    valid_bytes = 0
+    with open(output, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                done.add(json.loads(line)['group_id'])
+            except (ValueError, KeyError):
+                break
+            valid_bytes += len(line)
+    with open(output, 'r+b') as f:
+        f.truncate(valid_bytes)
+    return done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='compute settlements for every group from the transactions and settlements tables')
+    parser.add_argument('--table', default=os.environ.get('TRANS_TABLE', 'splitwise_transactions'))
+    parser.add_argument('--settle-table', default=os.environ.get('SETTLE_TABLE', 'splitwise_settlements'),
+                        help="recorded payments table, '' to skip")
+    parser.add_argument('--output', required=True, help='json lines output file')
+    parser.add_argument('--checkpoint', help='scan checkpoint file (default <output>.ckpt)')
+    parser.add_argument('--checkpoint-every', type=float, default=30, help='seconds between scan checkpoints')
+    parser.add_argument('--segments', type=int, default=8, help='number of parallel scan segments')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='settlement worker processes')
+    parser.add_argument('--chunk-size', type=int, default=256, help='groups per settlement task')
+    args = parser.parse_args(argv)
+
+    tables = [args.table] + ([args.settle_table] if args.settle_table else [])
+    checkpoint = args.checkpoint or args.output + '.ckpt'
+    if os.path.exists(checkpoint):
+        try:
+            state = ScanState.load(checkpoint, tables, args.segments)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"resuming from {checkpoint} - {state.items} records already read")
+    else:
+        if os.path.exists(args.output):
+            parser.error(f"{args.output} exists without a checkpoint, remove it or choose another output")
+        state = ScanState(tables, args.segments)
+
+    start = time.monotonic()
+    scan_tables(state, checkpoint, args.checkpoint_every)
+    print(f"read {state.items} records for {len(state.totals)} groups in {time.monotonic() - start:.1f}s")
+
+    done = completed_groups(args.output)
+    pending = ((group_id, dict(amounts)) for group_id, amounts in state.totals.items() if group_id not in done)
+    written = errors = 0
+    # Executor.map submits every task up front, keep a bounded window of chunks in flight instead
+    max_in_flight = 2 * args.workers
+    in_flight = deque()
+    with open(args.output, 'a') as out, ProcessPoolExecutor(max_workers=args.workers) as pool:
+        def write_oldest():
+            nonlocal written, errors
+            for result in in_flight.popleft().result():
+                out.write(json.dumps(result, separators=(',', ':')) + '\n')
+                written += 1
+                errors += 'error' in result
+
+        for chunk in chunked(pending, args.chunk_size):
+            in_flight.append(pool.submit(settle_chunk, chunk))
+            if len(in_flight) >= max_in_flight:
+                write_oldest()
+        while in_flight:
+            write_oldest()
+    print(f"settled {written} groups ({len(done)} from a previous run, {errors} with mismatched totals) into {args.output}")
+
+    os.remove(checkpoint)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import json
+import random
+
+import pytest
+
+from load_test import LatencyHistogram, ZipfSampler, load_results, main
+
+
+def test_percentile_reports_top_of_bucket():
+    hist = LatencyHistogram()
+    for value in range(1, 100001):
+        hist.record(value)
+    # 99000 falls in the [98816, 99327] bucket of the 7 bit histogram
+    assert hist.percentile(99) == 99327
+    assert hist.percentile(100) == 100000
+    # small values are recorded exactly
+    assert hist.percentile(0.1) == 100
+
+
+def test_percentile_capped_at_max():
+    hist = LatencyHistogram()
+    hist.record(1000)
+    assert hist._bucket_max(hist._bucket(1000)) == 1000
+    assert hist.percentile(50) == 1000
+
+
+def test_bucket_max_bounds_relative_error():
+    hist = LatencyHistogram(precision_bits=7)
+    hist.max = 10 ** 9
+    for value in (1, 127, 128, 129, 1000, 65537, 10 ** 6, 123456789):
+        bucket = hist._bucket(value)
+        top = hist._bucket_max(bucket)
+        assert bucket <= value <= top
+        assert top - bucket < max(1, bucket) / 2 ** 6
+        assert hist._bucket(top) == bucket
+
+
+def test_percentile_empty():
+    assert LatencyHistogram().percentile(99) == 0
+
+
+def test_zipf_sampler_range_and_skew():
+    sampler = ZipfSampler(20, 1.1, random.Random(7))
+    counts = [0] * 20
+    for _ in range(20000):
+        counts[sampler.sample()] += 1
+    assert sum(counts) == 20000
+    # rank 1 is picked about 2^1.1 times as often as rank 2
+    assert 1.8 < counts[0] / counts[1] < 2.5
+    assert counts[0] > counts[9] > counts[19] > 0
+
+
+def test_zipf_sampler_uniform():
+    sampler = ZipfSampler(4, 0, random.Random(7))
+    counts = [0] * 4
+    for _ in range(40000):
+        counts[sampler.sample()] += 1
+    assert all(9000 < count < 11000 for count in counts)
+
+
+def test_load_results(tmp_path):
+    path = tmp_path / 'run.json'
+    path.write_text(json.dumps({'started': 'x', 'endpoints': {'summary': {'errors': 0, 'throughput_rps': 1, 'percentiles_ms': {}}}}))
+    assert load_results(str(path))['started'] == 'x'
+
+    path.write_text('{"started": "x", "endpoints": {"summary": {}}}')
+    with pytest.raises(ValueError):
+        load_results(str(path))
+    path.write_text('not json')
+    with pytest.raises(ValueError):
+        load_results(str(path))
+
+
+def test_bad_compare_fails_before_the_run(tmp_path):
+    # exits during argument checks, before any request is sent to the (unreachable) target
+    with pytest.raises(SystemExit):
+        main(['--target', 'http://127.0.0.1:9', '--compare', str(tmp_path / 'missing.json')])
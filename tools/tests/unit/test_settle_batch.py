@@ -0,0 +1,89 @@
+import json
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from settle_batch import ScanState, chunked, completed_groups, scan_tables, settle_group
+
+
+def write_lines(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_completed_groups_missing_output(tmp_path):
+    assert completed_groups(str(tmp_path / 'missing.jsonl')) == set()
+
+
+def test_completed_groups_keeps_complete_lines(tmp_path):
+    data = b'{"group_id":"a","payments":[]}\n{"group_id":"b","payments":[]}\n'
+    output = write_lines(tmp_path / 'out.jsonl', data)
+    assert completed_groups(output) == {'a', 'b'}
+    assert (tmp_path / 'out.jsonl').read_bytes() == data
+
+
+def test_completed_groups_truncates_partial_last_line(tmp_path):
+    complete = b'{"group_id":"a","payments":[]}\n'
+    output = write_lines(tmp_path / 'out.jsonl', complete + b'{"group_id":"b","paym')
+    assert completed_groups(output) == {'a'}
+    assert (tmp_path / 'out.jsonl').read_bytes() == complete
+
+
+def test_completed_groups_truncates_last_line_without_newline(tmp_path):
+    # a full json document whose newline was never written is still a partial write
+    complete = b'{"group_id":"a","payments":[]}\n'
+    output = write_lines(tmp_path / 'out.jsonl', complete + b'{"group_id":"b","payments":[]}')
+    assert completed_groups(output) == {'a'}
+    assert (tmp_path / 'out.jsonl').read_bytes() == complete
+
+
+def test_settle_group():
+    result = settle_group(('g1', {'a': Decimal('200'), 'b': Decimal('-100'), 'c': Decimal('-100')}))
+    assert result['group_id'] == 'g1'
+    assert sorted(result['payments']) == [['b', 'a', '100.00'], ['c', 'a', '100.00']]
+    json.dumps(result)
+
+
+def test_settle_group_mismatch():
+    result = settle_group(('g1', {'a': Decimal('200'), 'b': Decimal('-100')}))
+    assert result == {'group_id': 'g1', 'error': 'transaction amounts do not add up to zero', 'total': '100'}
+
+
+def test_chunked():
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunked([], 2)) == []
+
+
+class EndlessTable:
+    """ segment 0 fails on its second page, every other segment has pages forever """
+
+    def __init__(self):
+        self.pages = 0
+
+    def scan(self, Segment, **kwargs):
+        self.pages += 1
+        if Segment == 0 and 'ExclusiveStartKey' in kwargs:
+            raise RuntimeError('segment 0 failed')
+        time.sleep(0.01)
+        return {'Items': [{'group_id': 'g', 'payables': {'a': Decimal(1), 'b': Decimal(-1)}}],
+                'LastEvaluatedKey': {'trans_id': str(self.pages)}}
+
+
+def test_failed_segment_stops_the_scan(monkeypatch, tmp_path):
+    import boto3
+    table = EndlessTable()
+    resource = SimpleNamespace(Table=lambda name: table)
+    monkeypatch.setattr(boto3.session, 'Session', lambda: SimpleNamespace(resource=lambda service: resource))
+
+    state = ScanState(['trans'], 4)
+    checkpoint = str(tmp_path / 'scan.ckpt')
+    start = time.monotonic()
+    with pytest.raises(RuntimeError):
+        scan_tables(state, checkpoint, 60)
+    assert time.monotonic() - start < 5
+    # every page merged before stopping is in the checkpoint
+    saved = ScanState.load(checkpoint, ['trans'], 4)
+    assert saved.items == state.items
+    assert not any(seg['done'] for seg in saved.segments.values())